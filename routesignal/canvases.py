@@ -3,6 +3,7 @@ import matplotlib
 matplotlib.use('Qt5Agg')
 import matplotlib.pyplot as plt
 import routesignal.models as md
+import routesignal.profiling as prof
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 from typing import List
@@ -26,6 +27,8 @@ class SignalCanvas(MplCanvas):
         self.marker_list = {}
         self.areamap = areamap
         self.scalebar = None
+        self.coverage = None
+        self.coverage_layer = "rx_power"
         self.cmap = plt.cm.get_cmap("gist_heat")
         super(SignalCanvas, self).__init__()
 
@@ -59,6 +62,13 @@ class SignalCanvas(MplCanvas):
     def setMap(self, areamap):
         self.areamap = areamap
 
+    def setCoverage(self, coverage, layer="rx_power"):
+        self.coverage = coverage
+        self.coverage_layer = layer
+
+    def clearCoverage(self):
+        self.coverage = None
+
     def setScaleBar(self):
         x1, x2, y1, y2 = self.axes.axis()
         _y = (y1 + y2)/2
@@ -81,17 +91,37 @@ class SignalCanvas(MplCanvas):
         self.axes.scatter(cell.lon_array, cell.lat_array, zorder=1,
                 alpha=1.0, s=20, c=cell.power_array, cmap=self.cmap)
 
+    @prof.profiler.timed("canvas.coverage")
+    def drawCoverage(self, alpha=0.5, vmin=None, vmax=None):
+        """Draw the predicted coverage layer between the map image and the
+        measured points. vmin and vmax let the received power layer share the
+        measured points' colour scale."""
+        if self.coverage is None or self.coverage_layer is None:
+            return None
+        if self.coverage_layer == "best_server":
+            return self.axes.imshow(self.coverage.best_server, zorder=0.5,
+                    alpha=alpha, extent=self.coverage.extent, aspect="equal",
+                    cmap="tab20", interpolation="nearest")
+        if self.coverage_layer == "sinr":
+            return self.axes.imshow(self.coverage.sinr, zorder=0.5, alpha=alpha,
+                    extent=self.coverage.extent, aspect="equal", cmap="viridis")
+        return self.axes.imshow(self.coverage.rx_power, zorder=0.5,
+                alpha=alpha, extent=self.coverage.extent, aspect="equal",
+                cmap=self.cmap, vmin=vmin, vmax=vmax)
+
     def drawMarker(self, marker):
         self.axes.scatter(marker.lon, marker.lat, zorder=1, alpha=1.0,
                 s=32, color="black")
         self.axes.annotate(marker.label, marker.lon, marker.lat,
                 fontsize=14)
 
+    @prof.profiler.timed("canvas.redraw")
     def redraw(self, cell):
         self.axes.cla()
         divider = make_axes_locatable(self.axes)
         cax = divider.append_axes("right", size="5%", pad=0.1)
         self.axes.imshow(self.cellmap.get_map(), zorder=0, extent = self.map_extent, aspect="equal")
+        self.drawCoverage()
         powerscatter = self.drawCell(cell)
         towerscatter = [self.drawTower(tower_list[tower]) for tower in
                 self.tower_list]
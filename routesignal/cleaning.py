@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import routesignal.utils as utils
+
+RULES = ("duplicates", "rating", "jumps", "stale")
+
+class Cleaner:
+    """Cleaner removes bad measurements from a table sorted by measured_at,
+    before it is partitioned into cells. Every rule is evaluated over whole
+    columns and the flagged rows are dropped in a single pass. The rules are:
+
+    duplicates: repeated (cellid, measured_at) rows.
+    rating: fixes whose rating, the GPS accuracy radius in metres, lies
+        outside [min_rating, max_rating]. Either bound may be None.
+    jumps: fixes reached from and left to their neighbouring fixes at an
+        implied speed above max_speed_factor times the reported speed plus
+        speed_slack (m/s). Neighbours more than max_gap seconds away are
+        ignored. A fix with only one neighbour is flagged when that step is
+        inconsistent and the neighbour's step onward is consistent, so the
+        bad end of the pair is dropped; an isolated inconsistent pair is kept,
+        as there is no telling which fix is wrong.
+    stale: fixes at exactly the previous fix's coordinates while the reported
+        speed is above stale_speed (m/s), i.e. the GPS position stopped
+        updating while moving.
+
+    Rows sharing a measured_at are treated as one fix seen by several cells.
+    After clean(), counters holds the number of rows each rule flagged (a row
+    can be flagged by several rules) along with the input and kept row
+    counts."""
+    def __init__(self, dedupe=True, min_rating=None, max_rating=None,
+            check_jumps=True, max_speed_factor=3.0, speed_slack=10.0, max_gap=60,
+            drop_stale=True, stale_speed=2.0):
+        self.dedupe = dedupe
+        self.min_rating = min_rating
+        self.max_rating = max_rating
+        self.check_jumps = check_jumps
+        self.max_speed_factor = max_speed_factor
+        self.speed_slack = speed_slack
+        self.max_gap = max_gap
+        self.drop_stale = drop_stale
+        self.stale_speed = stale_speed
+        self.counters = {}
+
+    def clean(self, data):
+        """Get data with every flagged row removed, with a fresh index."""
+        flags = {rule: np.zeros(len(data), dtype=bool) for rule in RULES}
+        if len(data):
+            measured_at = data["measured_at"].to_numpy()
+            new_fix = np.empty(len(data), dtype=bool)
+            new_fix[0] = True
+            np.not_equal(measured_at[1:], measured_at[:-1], out=new_fix[1:])
+            fix_of_row = np.cumsum(new_fix) - 1
+
+            if self.dedupe:
+                flags["duplicates"] = self._duplicates(data, fix_of_row)
+
+            rating = data["rating"].to_numpy(dtype=float)
+            if self.min_rating is not None:
+                flags["rating"] |= rating < self.min_rating
+            if self.max_rating is not None:
+                flags["rating"] |= rating > self.max_rating
+
+            if self.check_jumps or self.drop_stale:
+                flags["jumps"], flags["stale"] = self._check_fixes(data, new_fix, fix_of_row)
+
+        drop = np.zeros(len(data), dtype=bool)
+        for rule in RULES:
+            drop |= flags[rule]
+        removed = int(np.count_nonzero(drop))
+        self.counters = {rule: int(np.count_nonzero(flags[rule])) for rule in RULES}
+        self.counters["input"] = len(data)
+        self.counters["kept"] = len(data) - removed
+        if removed == 0:
+            return data.reset_index(drop=True)
+        return data.take(np.flatnonzero(~drop)).reset_index(drop=True)
+
+    def _duplicates(self, data, fix_of_row):
+        # Rows are sorted by time, so a key of (fix, cell) is already sorted by
+        # fix and the stable sort only has to reorder rows within each fix.
+        # Later copies are flagged and the first is kept.
+        codes, uniques = pd.factorize(data["cellid"].to_numpy())
+        keys = fix_of_row * max(len(uniques), 1) + codes
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        duplicates = np.zeros(len(data), dtype=bool)
+        duplicates[order[1:][sorted_keys[1:] == sorted_keys[:-1]]] = True
+        return duplicates
+
+    def _check_fixes(self, data, new_fix, fix_of_row):
+        # Exports usually hold one row per fix, in which case no gathering is
+        # needed.
+        single = fix_of_row[-1] == len(data) - 1
+        first_rows = slice(None) if single else np.flatnonzero(new_fix)
+        t = data["measured_at"].to_numpy()[first_rows] / 1000
+        lat = data["lat"].to_numpy(dtype=float)[first_rows]
+        lon = data["lon"].to_numpy(dtype=float)[first_rows]
+        speed = data["speed"].to_numpy(dtype=float)[first_rows]
+
+        # Quantities for the step between each pair of consecutive fixes.
+        dt = np.diff(t)
+        linked = (dt > 0) & (dt <= self.max_gap)
+        jumps = np.zeros(len(t), dtype=bool)
+        if self.check_jumps and len(t) > 1:
+            moved = utils.get_haversine_distance(lat[:-1], lon[:-1], lat[1:], lon[1:]) * 1000
+            allowed = self.max_speed_factor * np.fmax(speed[:-1], speed[1:]) + self.speed_slack
+            inconsistent = linked & (moved > allowed * dt)
+
+            has_in = np.concatenate(([False], linked))
+            has_out = np.concatenate((linked, [False]))
+            bad_in = np.concatenate(([False], inconsistent))
+            bad_out = np.concatenate((inconsistent, [False]))
+            # Whether the step beyond the next (or previous) fix is linked and
+            # consistent, which decides which end of a bad step is wrong.
+            good = linked & ~inconsistent
+            next_good = np.concatenate((good[1:], [False, False]))
+            previous_good = np.concatenate(([False, False], good[:-1]))
+            jumps = ((has_in & has_out & bad_in & bad_out) |
+                    (~has_in & bad_out & next_good) |
+                    (~has_out & bad_in & previous_good))
+
+        stale = np.zeros(len(t), dtype=bool)
+        if self.drop_stale:
+            same_place = (lat[1:] == lat[:-1]) & (lon[1:] == lon[:-1]) & (dt > 0)
+            stale[1:] = same_place & (speed[1:] > self.stale_speed)
+
+        if single:
+            return jumps, stale
+        return jumps[fix_of_row], stale[fix_of_row]
@@ -14,6 +14,8 @@ class Config:
                 self.tower_lat = self.data.get("tower_lat", None)
                 self.tower_lon = self.data.get("tower_lon", None)
                 self.tower_label = self.data.get("tower_label", "Tower")
+                self.tower_db = self.data.get("tower_db", None)
+                self.towers = self.data.get("towers", [])
                 self.freq = self.data.get("freq", 50)
                 self.alpha = self.data.get("alpha", 1)
                 self.beta = self.data.get("beta", 1)
@@ -33,12 +35,15 @@ class Config:
                 self.large_city = self.data.get("large_city", True)
                 self.path_gain = self.data.get("path_gain", False)
                 self.coherence_length = self.data.get("coherence_length", 1)
+                self.cleaning = self.data.get("cleaning", {})
         except:
             print("Could not load {0}. Setting defaults...".format(self.filename))
             self.signal_data_files = None
             self.tower_lat = None
             self.tower_lon = None
             self.tower_label = "Tower"
+            self.tower_db = None
+            self.towers = []
             self.freq = 50
             self.alpha = 1
             self.beta = 1
@@ -58,6 +63,7 @@ class Config:
             self.large_city = True
             self.path_gain = False
             self.coherence_length = 1
+            self.cleaning = {}
 
     def save(self):
         with open(self.filename, "w") as stream:
@@ -81,12 +87,17 @@ class Config:
                 'oh_correction_factor': self.oh_correction_factor,
                 'large_city': self.large_city,
                 'path_gain': self.path_gain,
-                'coherence_length': self.coherence_length
+                'coherence_length': self.coherence_length,
+                'cleaning': self.cleaning
             }
             if self.tower_lat and self.tower_lon:
               self.lastcfg['tower_lat'] = self.tower_lat
               self.lastcfg['tower_lon'] = self.tower_lon
               if self.tower_label:
                   self.lastcfg['tower_label'] = self.tower_label
+            if self.tower_db:
+              self.lastcfg['tower_db'] = self.tower_db
+            if self.towers:
+              self.lastcfg['towers'] = self.towers
 
             yaml.dump(self.lastcfg, stream)
@@ -0,0 +1,120 @@
+import os
+import types
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import routesignal.models as md
+import routesignal.profiling as prof
+
+EARTH_RADIUS_M = 6371008.8
+
+LAYERS = ("rx_power", "best_server", "sinr")
+
+class CoverageRaster:
+    """Class containing predicted coverage layers over a map extent. extent is
+    (lon_min, lon_max, lat_min, lat_max) as in bbox.txt, and row 0 of each
+    layer is the northern edge, matching the map image. best_server holds
+    indexes into towers, rx_power is the best server's received power in dBm
+    and sinr is in dB."""
+    def __init__(self, extent, towers, rx_power, best_server, sinr):
+        self.extent = extent
+        self.towers = towers
+        self.rx_power = rx_power
+        self.best_server = best_server
+        self.sinr = sinr
+
+    def get_layer(self, name):
+        if name not in LAYERS:
+            raise ValueError(f"Unknown coverage layer {name}, expected one of {LAYERS}")
+        return getattr(self, name)
+
+class CoverageEngine:
+    """CoverageEngine predicts received power from many towers over every pixel
+    of a map extent using one of the ModelEngine models. Each tower's height
+    replaces bs_height and its tx_power replaces the config tx_power when set.
+    Pixel distances use a local flat-earth approximation, which is accurate to
+    well under a metre over the few kilometres a map covers and lets each
+    tower's distance grid be built from one row and one column vector. The
+    raster is computed in row tiles no larger than max_bytes per layer, with
+    at least one tile per worker (os.cpu_count() by default) so the whole
+    process pool is used, and only the running best server, best power and
+    total power are kept per tile."""
+    def __init__(self, config, model="ohu", workers=None, max_bytes=16 * 1024 * 1024,
+            noise_dbm=-104):
+        self.config = config
+        self.model = model
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.noise_dbm = noise_dbm
+
+    def predict(self, towers, extent, shape):
+        """Predict coverage for towers over extent at shape (height, width)
+        pixels."""
+        height, width = shape
+        lon_min, lon_max, lat_min, lat_max = extent
+        lons = lon_min + (np.arange(width) + 0.5) * (lon_max - lon_min) / width
+        lats = lat_max - (np.arange(height) + 0.5) * (lat_max - lat_min) / height
+
+        tower_lats = np.array([tower.lat for tower in towers], dtype=float)
+        tower_lons = np.array([tower.lon for tower in towers], dtype=float)
+        tower_heights = np.array([self.config.bs_height if tower.height is None
+            else tower.height for tower in towers], dtype=float)
+        tower_powers = np.array([self.config.tx_power if getattr(tower, "tx_power", None) is None
+            else tower.tx_power for tower in towers], dtype=float)
+        snapshot = {name: value for name, value in vars(self.config).items()
+                if value is None or np.isscalar(value)}
+
+        workers = self.workers or os.cpu_count() or 1
+        rows_per_tile = max(1, min(self.max_bytes // (8 * width), -(-height // workers)))
+        args = [(snapshot, self.model, lats[start:start + rows_per_tile], lons,
+            tower_lats, tower_lons, tower_heights, tower_powers, self.noise_dbm)
+            for start in range(0, height, rows_per_tile)]
+
+        with prof.profiler.span("coverage.predict", pixels=height * width,
+                towers=len(towers), tiles=len(args)):
+            if self.workers == 1 or len(args) == 1:
+                tiles = [_predict_tile(*arg) for arg in args]
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    tiles = list(executor.map(_predict_tile, *zip(*args)))
+
+        rx_power, best_server, sinr = (np.concatenate(layer) for layer in zip(*tiles))
+        return CoverageRaster(tuple(extent), towers, rx_power, best_server, sinr)
+
+    def predict_dataset(self, dataset, towers, shape=None):
+        """Predict coverage over a Dataset's map extent, at the map image
+        resolution unless shape is given."""
+        if shape is None:
+            shape = dataset.plot_map.shape[:2]
+        return self.predict(towers, dataset.map_bbox[0], shape)
+
+def _predict_tile(snapshot, model, lats, lons, tower_lats, tower_lons,
+        tower_heights, tower_powers, noise_dbm):
+    config = types.SimpleNamespace(**snapshot)
+    engine = md.ModelEngine(config)
+    path_loss = getattr(engine, f"{model}_pl")
+    shape = (len(lats), len(lons))
+
+    best_power = np.full(shape, -np.inf, dtype=np.float32)
+    best_server = np.zeros(shape, dtype=np.int32)
+    total_mw = np.zeros(shape, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for index in range(len(tower_lats)):
+            dy = np.radians(lats - tower_lats[index]) * EARTH_RADIUS_M
+            dx = np.radians(lons - tower_lons[index]) * EARTH_RADIUS_M
+            scale = np.cos(np.radians(lats))
+            distance = np.sqrt(np.square(dy)[:, np.newaxis] +
+                    np.square(scale[:, np.newaxis] * dx[np.newaxis, :]) +
+                    np.square(tower_heights[index])).astype(np.float32)
+
+            config.bs_height = tower_heights[index]
+            power = (tower_powers[index] - path_loss(distance)).astype(np.float32)
+
+            better = power > best_power
+            best_power = np.where(better, power, best_power)
+            best_server[better] = index
+            total_mw += np.power(10.0, power / 10.0)
+
+    best_mw = np.power(10.0, best_power / 10.0)
+    interference_mw = np.maximum(total_mw - best_mw, 0) + np.power(10.0, noise_dbm / 10.0)
+    sinr = (10 * np.log10(best_mw / interference_mw)).astype(np.float32)
+    return best_power, best_server, sinr
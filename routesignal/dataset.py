@@ -3,7 +3,10 @@ import time
 import statistics as stat
 import numpy as np
 import pandas as pd
+from dateutil import tz as dateutil_tz
 import routesignal.utils as utils
+import routesignal.profiling as prof
+import routesignal.query as qr
 from cellmap import CellMap
 
 class Cell:
@@ -30,15 +33,19 @@ class Cell:
         self.power_mw = [np.power(10, (-1 * dBm) / 10) for dBm in self.data['signal']]
 
         self.geometric_average = stat.fmean(self.data['signal'])
-        self.geometric_stdev_db = stat.stdev(self.data['signal'])
+        if len(self.data) > 1:
+            self.geometric_stdev_db = stat.stdev(self.data['signal'])
+        else:
+            self.geometric_stdev_db = 0.0
 
 class Tower:
     """Class containing basic information about a tower."""
-    def __init__(self, lat, lon, label, height=None):
+    def __init__(self, lat, lon, label, height=None, tx_power=None):
         self.lat = lat
         self.lon = lon
         self.label = label
         self.height = height
+        self.tx_power = tx_power
 
     def get_distance(self, point):
         return utils.get_distance(self.lat, self.lon, point.lat, point.lon) 
@@ -46,11 +53,89 @@ class Tower:
     def get_distances(self, points):
         return [self.get_distance(point) for point in points]
 
-class Dataset:
-    """Class containing the measured data info."""
-    def __init__(self, datafiles):
+class DataView:
+    """Class containing a subset of the measured data rows, partitioned into
+    Cells on first access. positions holds the row positions of the subset
+    within the parent Dataset."""
+    def __init__(self, data, positions=None):
+        self.data = data
+        if positions is None:
+            positions = np.arange(len(data))
+        self.positions = positions
+        self.unique_cellids = self.data['cellid'].unique()
+        self._cells = None
+
+    @property
+    def cells(self):
+        if self._cells is None:
+            with prof.profiler.span("dataset.partition", rows=len(self.data)):
+                self._cells = {cellid: Cell(rows, cellid) for cellid, rows in
+                        self.data.groupby('cellid', sort=False)}
+            prof.profiler.count("dataset.cells", len(self._cells))
+        return self._cells
+
+    """Get the Cell matching a particular cellid."""
+    def get_cell(self, cellid):
+        return self.cells[int(cellid)]
+
+    def get_path_loss(self, cellid, tx_power, tx_gain, rx_gain):
+        return [tx_power - xi - tx_gain - rx_gain for xi in self.cells[int(cellid)].data['signal']]
+
+    def get_signal_power(self, cellid):
+        return [xi for xi in self.cells[int(cellid)].data['signal']]
+
+    def get_distances(self, cellid, tower_lat, tower_lon, bs_height):
+        with prof.profiler.span("dataset.distances", cellid=int(cellid)):
+            return [np.sqrt(np.square(bs_height) +
+                np.square(utils.get_distance(tower_lat, tower_lon, data_point.lat,
+                    data_point.lon) * 1000)) for index, data_point in self.cells[int(cellid)].data.iterrows()]
+
+class Session(DataView):
+    """Class containing a single drive, i.e. a contiguous run of measurements
+    with no gap longer than the Dataset session_gap."""
+    def __init__(self, data, positions, index):
+        super(Session, self).__init__(data, positions)
+        self.index = index
+        self.start = pd.Timestamp(int(data['measured_at'].iloc[0]), unit='ms', tz='UTC')
+        self.end = pd.Timestamp(int(data['measured_at'].iloc[-1]), unit='ms', tz='UTC')
+
+    def label(self, tz=None):
+        start = self.start.tz_convert(tz or dateutil_tz.tzlocal())
+        return f"{self.index}: {start:%Y-%m-%d %H:%M} ({len(self.data)} pts)"
+
+class Dataset(DataView):
+    """Class containing the measured data info. Rows are sorted by
+    measured_at at load so that time queries resolve with searchsorted, and
+    are segmented into Sessions wherever consecutive measurements are more
+    than session_gap seconds apart. If a cleaning.Cleaner is given, it runs
+    on the sorted rows before they are partitioned into cells, and its
+    counters are kept as cleaning_report."""
+    def __init__(self, datafiles, session_gap=600, cleaner=None):
         self.datafiles = datafiles
-        self.data = pd.concat([pd.read_csv(datafile).drop(['bid', 'sid', 'nid', 'psc'], axis=1) for datafile in datafiles])
+        with prof.profiler.span("dataset.ingest", files=len(datafiles)):
+            data = read_measurements(datafiles)
+        self.cleaning_report = {}
+        if cleaner is not None:
+            with prof.profiler.span("dataset.clean", rows=len(data)):
+                data = cleaner.clean(data)
+            self.cleaning_report = cleaner.counters
+            removed = self.cleaning_report["input"] - self.cleaning_report["kept"]
+            print(f"cleaning removed {removed} rows: " +
+                    ", ".join(f"{rule} {count}" for rule, count in self.cleaning_report.items()))
+        prof.profiler.count("dataset.rows", len(data))
+        super(Dataset, self).__init__(data)
+
+        self.timestamps = self.data['measured_at'].to_numpy()
+        self.session_gap = session_gap
+        breaks = np.flatnonzero(np.diff(self.timestamps) > session_gap * 1000) + 1
+        self.session_starts = np.concatenate(([0], breaks))
+        self.session_ends = np.concatenate((breaks, [len(self.timestamps)]))
+        self.sessions = {}
+        self._seconds_of_day = {}
+        self._last_query = None
+
+        with prof.profiler.span("dataset.index", rows=len(self.data)):
+            self.indexes = qr.build_indexes(self.data)
 
         self.mobile_country_codes = self.data['mcc']
         self.mobile_network_codes = self.data['mnc']
@@ -60,11 +145,6 @@ class Dataset:
         self.unique_mobile_network_codes = self.mobile_network_codes.unique()
         self.unique_local_area_codes = self.local_area_codes.unique()
         self.unique_cellids = self.cellids.unique()
-        self.cells = {}
-
-        for cellid in self.data['cellid'].unique():
-            self.cells[cellid] = Cell(self.data.loc[self.data['cellid'] ==
-                cellid], cellid)
 
         self.signal_power = pd.concat([cell.data['signal'] for key, cell in self.cells.items()])
 
@@ -79,23 +159,112 @@ class Dataset:
         self.map_path = self.data_path() + "/map.png"
         self.bbox_path = self.data_path() + "/bbox.txt"
         self.cellmap = CellMap(self.map_path)
-        self.plot_map = self.cellmap.get_map()
+        with prof.profiler.span("dataset.map"):
+            self.plot_map = self.cellmap.get_map()
         self.map_bbox = self.cellmap.get_bbox()
 
     def data_path(self):
         return self.datafiles[0].rsplit('/', 1)[0]
 
-    """Get the Cell matching a particular cellid."""
-    def get_cell(self, cellid):
-        return self.cells[int(cellid)]
+    def session_count(self):
+        return len(self.session_starts)
 
-    def get_path_loss(self, cellid, tx_power, tx_gain, rx_gain):
-        return [tx_power - xi - tx_gain - rx_gain for xi in self.cells[int(cellid)].data['signal']]
+    def get_session(self, index):
+        """Get the Session with the given index, in chronological order."""
+        if index not in self.sessions:
+            start = self.session_starts[index]
+            end = self.session_ends[index]
+            self.sessions[index] = Session(self.data.iloc[start:end],
+                    np.arange(start, end), index)
+        return self.sessions[index]
 
-    def get_signal_power(self, cellid):
-        return [xi for xi in self.cells[int(cellid)].data['signal']]
+    def query(self, within=None, **filters):
+        """Get a DataView of the rows matching every filter. Columns in
+        query.CATEGORICAL_COLUMNS take a value or a list of values, and columns
+        in query.RANGE_COLUMNS take an inclusive (lo, hi) pair where either
+        bound may be None. within restricts the result to the rows of another
+        view of this Dataset, such as a Session. Without filters, within (or
+        the Dataset) is returned as is, so its partitioned cells are reused,
+        and repeating the last query returns the same view."""
+        terms = []
+        for column, predicate in filters.items():
+            if column not in self.indexes:
+                raise ValueError(f"Column {column} is not indexed")
+            terms.append((self.indexes[column], predicate))
+        if not terms:
+            return self if within is None else within
+        key = repr(sorted(filters.items()))
+        if self._last_query and self._last_query[0] is within and self._last_query[1] == key:
+            return self._last_query[2]
+        if within is not None and within is not self:
+            terms.append((qr.PositionSet(within.positions), None))
+        with prof.profiler.span("dataset.query", terms=len(terms)):
+            positions = qr.resolve(terms)
+        view = DataView(self.data.iloc[positions], positions)
+        self._last_query = (within, key, view)
+        return view
 
-    def get_distances(self, cellid, tower_lat, tower_lon, bs_height):
-        return [np.sqrt(np.square(bs_height) +
-            np.square(utils.get_distance(tower_lat, tower_lon, data_point.lat,
-                data_point.lon) * 1000)) for index, data_point in self.cells[int(cellid)].data.iterrows()]
+    def get_time_range(self, start, end):
+        """Get a DataView of the measurements taken in [start, end). start and
+        end may be epoch milliseconds, datetimes or pandas Timestamps."""
+        lo = np.searchsorted(self.timestamps, _to_epoch_ms(start), side='left')
+        hi = np.searchsorted(self.timestamps, _to_epoch_ms(end), side='left')
+        return DataView(self.data.iloc[lo:hi], np.arange(lo, hi))
+
+    def get_time_of_day(self, start, end, tz=None):
+        """Get a DataView of the measurements whose local time of day falls in
+        [start, end), given as datetime.time objects. The window may wrap
+        past midnight."""
+        seconds = self._get_seconds_of_day(tz)
+        lo = _to_seconds(start)
+        hi = _to_seconds(end)
+        if lo <= hi:
+            mask = (seconds >= lo) & (seconds < hi)
+        else:
+            mask = (seconds >= lo) | (seconds < hi)
+        positions = np.flatnonzero(mask)
+        return DataView(self.data.iloc[positions], positions)
+
+    def get_sessions_by_time_of_day(self, start, end, tz=None):
+        """Get the Sessions that began at a local time of day in [start,
+        end)."""
+        seconds = self._get_seconds_of_day(tz)[self.session_starts]
+        lo = _to_seconds(start)
+        hi = _to_seconds(end)
+        if lo <= hi:
+            mask = (seconds >= lo) & (seconds < hi)
+        else:
+            mask = (seconds >= lo) | (seconds < hi)
+        return [self.get_session(index) for index in np.flatnonzero(mask)]
+
+    def _get_seconds_of_day(self, tz):
+        tz = tz or dateutil_tz.tzlocal()
+        key = str(tz)
+        if key not in self._seconds_of_day:
+            local = pd.to_datetime(self.timestamps, unit='ms', utc=True).tz_convert(tz)
+            self._seconds_of_day[key] = (local.hour * 3600 + local.minute * 60 + local.second).to_numpy()
+        return self._seconds_of_day[key]
+
+def read_measurements(datafiles):
+    """Read measurement files into one table without the unused bid, sid,
+    nid and psc columns, stably sorted by measured_at so rows of one fix keep
+    their file order."""
+    data = pd.concat([pd.read_csv(datafile).drop(['bid', 'sid', 'nid', 'psc'], axis=1) for datafile in datafiles], ignore_index=True)
+    return data.sort_values('measured_at', kind='stable', ignore_index=True)
+
+def _to_epoch_ms(value):
+    if isinstance(value, (int, np.integer)):
+        return value
+    if isinstance(value, (float, np.floating)):
+        # Epoch milliseconds read from a float column. Rounding up keeps both
+        # an inclusive start and an exclusive end exact on integer timestamps.
+        if not np.isfinite(value):
+            raise ValueError(f"Invalid timestamp {value}")
+        return int(np.ceil(value))
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize(dateutil_tz.tzlocal())
+    return timestamp.value // 1000000
+
+def _to_seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
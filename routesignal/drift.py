@@ -0,0 +1,225 @@
+#!/usr/bin/python3
+import os
+import hashlib
+import zipfile
+import argparse
+import numpy as np
+import pandas as pd
+from scipy import stats
+import routesignal.dataset as ds
+import routesignal.profiling as prof
+
+LEVELS = ("file", "cell", "bin")
+
+BIN_BITS = 32
+
+def make_bin_keys(lat, lon, bin_deg):
+    """Pack the indices of the bin_deg x bin_deg grid cells holding each point
+    into int64 keys. The grid is anchored at (-90, -180), so keys are the same
+    for every file aggregated with the same bin_deg."""
+    lat_index = np.floor((np.asarray(lat, dtype=float) + 90) / bin_deg).astype(np.int64)
+    lon_index = np.floor((np.asarray(lon, dtype=float) + 180) / bin_deg).astype(np.int64)
+    return (lat_index << BIN_BITS) | lon_index
+
+def get_bin_centers(keys, bin_deg):
+    """Get the (lat, lon) centres of the bins packed in keys."""
+    keys = np.asarray(keys, dtype=np.int64)
+    lat = ((keys >> BIN_BITS) + 0.5) * bin_deg - 90
+    lon = ((keys & ((1 << BIN_BITS) - 1)) + 0.5) * bin_deg - 180
+    return lat, lon
+
+def group_moments(keys, values):
+    """Get the sorted unique keys with the count, mean and M2 (sum of squared
+    deviations from the mean) of the values under each."""
+    keys, inverse = np.unique(keys, return_inverse=True)
+    count = np.bincount(inverse, minlength=len(keys))
+    mean = np.bincount(inverse, weights=values, minlength=len(keys)) / count
+    m2 = np.bincount(inverse, weights=np.square(values - mean[inverse]), minlength=len(keys))
+    return keys, count, mean, m2
+
+def merge_moments(keys, count, mean, m2):
+    """Merge partial (count, mean, M2) aggregates sharing a key into one per
+    key. This is the pairwise update of Chan et al. applied to all parts at
+    once: the merged M2 is the parts' M2 plus each part's count times its
+    squared distance from the merged mean, so it is exact however the rows
+    were split."""
+    keys, inverse = np.unique(keys, return_inverse=True)
+    total = np.bincount(inverse, weights=count, minlength=len(keys))
+    merged_mean = np.bincount(inverse, weights=count * mean, minlength=len(keys)) / total
+    spread = count * np.square(mean - merged_mean[inverse])
+    merged_m2 = np.bincount(inverse, weights=m2 + spread, minlength=len(keys))
+    return keys, total.astype(np.int64), merged_mean, merged_m2
+
+class Moments:
+    """Class containing the signal count, mean and M2 of each key at one
+    aggregation level, with keys sorted."""
+    def __init__(self, keys, count, mean, m2):
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.count = np.asarray(count, dtype=np.int64)
+        self.mean = np.asarray(mean, dtype=float)
+        self.m2 = np.asarray(m2, dtype=float)
+
+    def variance(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    def to_frame(self):
+        return pd.DataFrame({"count": self.count, "mean": self.mean,
+            "std": np.sqrt(self.variance())}, index=self.keys)
+
+class FileAggregate:
+    """Class containing the per-file, per-cell and per-bin signal moments of
+    one measurement file, along with the time span it covers and the bin size
+    its bin keys were built with."""
+    def __init__(self, path, levels, start, end, bin_deg):
+        self.path = path
+        self.levels = levels
+        self.start = start
+        self.end = end
+        self.bin_deg = bin_deg
+
+    @classmethod
+    def from_data(cls, path, data, bin_deg):
+        signal = data["signal"].to_numpy(dtype=float)
+        levels = {
+            "file": Moments(*group_moments(np.zeros(len(data), dtype=np.int64), signal)),
+            "cell": Moments(*group_moments(data["cellid"].to_numpy(dtype=np.int64), signal)),
+            "bin": Moments(*group_moments(make_bin_keys(data["lat"], data["lon"], bin_deg), signal)),
+        }
+        measured_at = data["measured_at"].to_numpy()
+        start = int(measured_at.min()) if len(measured_at) else 0
+        end = int(measured_at.max()) if len(measured_at) else 0
+        return cls(path, levels, start, end, bin_deg)
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename, allow_pickle=False) as stored:
+            levels = {level: Moments(*(stored[f"{level}_{field}"] for field in ("keys", "count", "mean", "m2")))
+                    for level in LEVELS}
+            return cls(str(stored["path"]), levels, int(stored["start"]), int(stored["end"]),
+                    float(stored["bin_deg"])), str(stored["stamp"])
+
+    def save(self, filename, stamp):
+        arrays = {f"{level}_{field}": getattr(moments, field)
+                for level, moments in self.levels.items() for field in ("keys", "count", "mean", "m2")}
+        with open(filename, "wb") as stream:
+            np.savez(stream, path=self.path, start=self.start, end=self.end, bin_deg=self.bin_deg,
+                    stamp=stamp, **arrays)
+
+class AggregateStore:
+    """Class persisting one FileAggregate per measurement file in directory.
+    A stored aggregate is reused while the file's size and modification time
+    and the store's bin_deg and cleaner settings are unchanged, so adding a
+    drive only reads that drive's rows."""
+    def __init__(self, directory, bin_deg=0.001, cleaner=None):
+        self.directory = directory
+        self.bin_deg = bin_deg
+        self.cleaner = cleaner
+        os.makedirs(directory, exist_ok=True)
+
+    def _filename(self, path):
+        digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+        return os.path.join(self.directory, digest + ".npz")
+
+    def _stamp(self, path):
+        info = os.stat(path)
+        settings = None
+        if self.cleaner is not None:
+            settings = sorted((name, value) for name, value in vars(self.cleaner).items() if name != "counters")
+        return repr((os.path.abspath(path), info.st_size, info.st_mtime_ns, self.bin_deg, settings))
+
+    def get(self, path):
+        """Get the aggregate of path, computing and storing it if the stored
+        one is missing, stale, or unreadable (e.g. written by an older version
+        without some of the fields)."""
+        filename = self._filename(path)
+        stamp = self._stamp(path)
+        if os.path.exists(filename):
+            try:
+                aggregate, stored_stamp = FileAggregate.load(filename)
+            except (KeyError, ValueError, EOFError, OSError, zipfile.BadZipFile):
+                stored_stamp = None
+            if stored_stamp == stamp:
+                prof.profiler.count("drift.reused")
+                return aggregate
+
+        with prof.profiler.span("drift.aggregate", path=os.path.basename(path)):
+            data = ds.read_measurements([path])
+            if self.cleaner is not None:
+                data = self.cleaner.clean(data)
+            aggregate = FileAggregate.from_data(path, data, self.bin_deg)
+        aggregate.save(filename, stamp)
+        prof.profiler.count("drift.aggregated")
+        return aggregate
+
+    def update(self, paths):
+        """Get the aggregates of all paths, in order."""
+        return [self.get(path) for path in paths]
+
+def get_bin_deg(aggregates):
+    """Get the bin size shared by file aggregates, or None if there are none.
+    Bin keys of different sizes cannot be merged, so a mix raises
+    ValueError."""
+    sizes = {aggregate.bin_deg for aggregate in aggregates}
+    if len(sizes) > 1:
+        raise ValueError(f"Aggregates were built with different bin sizes {sorted(sizes)}")
+    return sizes.pop() if sizes else None
+
+def combine(aggregates, level="cell"):
+    """Merge the moments of several file aggregates at one level."""
+    if level not in LEVELS:
+        raise ValueError(f"Unknown level {level}, expected one of {LEVELS}")
+    if level == "bin":
+        get_bin_deg(aggregates)
+    parts = [aggregate.levels[level] for aggregate in aggregates]
+    if not parts:
+        return Moments([], [], [], [])
+    return Moments(*merge_moments(*(np.concatenate([getattr(part, field) for part in parts])
+        for field in ("keys", "count", "mean", "m2"))))
+
+def compare(aggregates_a, aggregates_b, level="cell"):
+    """Compare the mean signal of two sets of drives at one level. Every key
+    seen in either set gets a row with the counts, means and standard
+    deviations of both, difference = mean_b - mean_a, and a two-sided Welch
+    t-test p_value. Keys seen in only one set, or with fewer than two samples
+    on a side, have NaN difference statistics. The bin level also gets bin
+    centre lat/lon columns, using the bin size the aggregates were built with;
+    both sets must share it."""
+    if level == "bin":
+        bin_deg = get_bin_deg(list(aggregates_a) + list(aggregates_b))
+    a = combine(aggregates_a, level).to_frame()
+    b = combine(aggregates_b, level).to_frame()
+    frame = a.join(b, how="outer", lsuffix="_a", rsuffix="_b").sort_index()
+    frame[["count_a", "count_b"]] = frame[["count_a", "count_b"]].fillna(0).astype(np.int64)
+
+    var_a = np.square(frame["std_a"].to_numpy()) / frame["count_a"].to_numpy()
+    var_b = np.square(frame["std_b"].to_numpy()) / frame["count_b"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frame["difference"] = frame["mean_b"] - frame["mean_a"]
+        frame["stderr"] = np.sqrt(var_a + var_b)
+        frame["t"] = frame["difference"] / frame["stderr"]
+        frame["dof"] = np.square(var_a + var_b) / (np.square(var_a) / (frame["count_a"] - 1) +
+                np.square(var_b) / (frame["count_b"] - 1))
+        frame["p_value"] = 2 * stats.t.sf(np.abs(frame["t"]), frame["dof"])
+
+    frame.index.name = {"file": "file", "cell": "cellid", "bin": "bin"}[level]
+    if level == "bin":
+        frame["lat"], frame["lon"] = get_bin_centers(frame.index.to_numpy(), bin_deg)
+    return frame
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the signal of two sets of drives.")
+    parser.add_argument("store", help="directory holding the per-file aggregates")
+    parser.add_argument("-a", nargs="+", required=True, help="measurement files of the first set")
+    parser.add_argument("-b", nargs="+", required=True, help="measurement files of the second set")
+    parser.add_argument("--level", choices=LEVELS, default="cell")
+    parser.add_argument("--bin-deg", type=float, default=0.001)
+    parser.add_argument("--alpha", type=float, default=0.05, help="only show differences with p_value below alpha")
+    args = parser.parse_args()
+
+    store = AggregateStore(args.store, args.bin_deg)
+    frame = compare(store.update(args.a), store.update(args.b), args.level)
+    print(frame[frame["p_value"] < args.alpha].sort_values("p_value").to_string())
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,22 @@
+from collections import OrderedDict
 import numpy as np
 from scipy import special as sp
 from scipy import constants
+import routesignal.profiling as prof
+
+OKUMURA_HATA_PARAMETERS = ("freq", "bs_height", "ue_height", "large_city", "tx_gain", "rx_gain")
+
+MODEL_PARAMETERS = {
+    "fs": ("freq", "tx_gain", "rx_gain"),
+    "tworay": ("bs_height", "ue_height", "tx_gain", "rx_gain"),
+    "abg": ("alpha", "beta", "gamma", "freq", "ref_dist", "tx_gain", "rx_gain", "sigma", "coherence_length"),
+    "ci": ("freq", "ref_dist", "pl_exp", "tx_gain", "rx_gain", "sigma", "coherence_length"),
+    "ohu": OKUMURA_HATA_PARAMETERS,
+    "ohs": OKUMURA_HATA_PARAMETERS,
+    "ohr": OKUMURA_HATA_PARAMETERS,
+}
+
+NOISY_MODELS = ("abg", "ci")
 
 class ModelEngine:
     """ModelEngine provides methods for calculating path loss (or path gain) based
@@ -9,9 +25,12 @@ class ModelEngine:
     each method. All public methods return loss/gain and sigma values in dB, while
     taking distances and heights in meters, frequency in MHz, and any other values
     as unitless. Methods with the _array suffix calculate path loss over an entire
-    range of distances."""
-    def __init__(self, config):
+    range of distances. The ABG and CI arrays add shadow fading; if a seed is
+    given, the same seed always produces the same fading, drawn from a separate
+    stream for each model so the two fadings stay independent."""
+    def __init__(self, config, seed=None):
         self.config = config
+        self.seed = seed
 
     def fs_pl(self, dist):
         """Calculate the free space path loss at a given distance."""
@@ -50,10 +69,9 @@ class ModelEngine:
         return self.ohu_pl(dist) - 4.78 * np.square(np.log10(self.config.freq)) + 18.33 * np.log10(self.config.freq) - 40.94
 
     def _large_city_correction_factor(self):
-        if self.config.freq < 300:
-            return 8.29 * np.square(np.log10(1.54 * self.config.ue_height)) - 1.1
-        else:
-            return 3.2 * np.square(np.log10(11.75 * self.config.ue_height)) - 4.97
+        return np.where(self.config.freq < 300,
+                8.29 * np.square(np.log10(1.54 * self.config.ue_height)) - 1.1,
+                3.2 * np.square(np.log10(11.75 * self.config.ue_height)) - 4.97)
 
     def _small_city_correction_factor(self):
         return (1.1 * np.log10(self.config.freq) - 0.7) * self.config.ue_height - (1.56 * np.log10(self.config.freq) - 0.8)
@@ -61,6 +79,13 @@ class ModelEngine:
     def _base_path_loss(self, dist):
         return 69.55 + 26.26 * np.log10(self.config.freq) + (44.9 - 6.55 * np.log10(self.config.bs_height)) * np.log10(dist / 1000) - 13.85 * np.log10(self.config.bs_height)
 
+    def _shadowing(self, model, size):
+        """Draw log-normal shadow fading for one of NOISY_MODELS, holding each
+        value for coherence_length consecutive points."""
+        rng = np.random if self.seed is None else np.random.default_rng((self.seed, NOISY_MODELS.index(model)))
+        blocks = (np.arange(size) + 1) // int(self.config.coherence_length)
+        return rng.normal(0, self.config.sigma, blocks[-1] + 1 if size else 0)[blocks]
+
     def fs_pl_array(self, x_range):
         return np.array([self.fs_pl(xi) for xi in x_range])
 
@@ -68,27 +93,12 @@ class ModelEngine:
         return np.array([self.tworay_pl(xi) for xi in x_range])
 
     def abg_pl_array(self, x_range):
-        random_val = np.random.normal(0, self.config.sigma)
-        random_array = []
-
-        for i in range(0, len(x_range)):
-            if (i+1) % int(self.config.coherence_length) == 0:
-                f"{i+1} == {self.config.coherence_length}"
-                random_val = np.random.normal(0, self.config.sigma)
-            random_array.append(random_val)
-
-        return np.array([self.abg_pl(xi) + random_array[index] for index, xi in enumerate(x_range)])
+        shadowing = self._shadowing("abg", len(x_range))
+        return np.array([self.abg_pl(xi) + shadowing[index] for index, xi in enumerate(x_range)])
 
     def ci_pl_array(self, x_range):
-        random_val = np.random.normal(0, self.config.sigma)
-        random_array = []
-
-        for i in range(0, len(x_range)):
-            if (i+1) % int(self.config.coherence_length) == 0:
-                random_val = np.random.normal(0, self.config.sigma)
-            random_array.append(random_val)
-
-        return np.array([self.ci_pl(xi) + random_array[index] for index, xi in enumerate(x_range)])
+        shadowing = self._shadowing("ci", len(x_range))
+        return np.array([self.ci_pl(xi) + shadowing[index] for index, xi in enumerate(x_range)])
 
     def ohu_pl_array(self, x_range):
         return np.array([self.ohu_pl(xi) for xi in x_range])
@@ -106,26 +116,12 @@ class ModelEngine:
         return np.array([self.tworay_pl(xi) * -1 for xi in x_range])
 
     def abg_pg_array(self, x_range):
-        random_val = np.random.normal(0, self.config.sigma)
-        random_array = []
-
-        for i in range(0, len(x_range)):
-            if (i+1) % int(self.config.coherence_length) == 0:
-                random_val = np.random.normal(0, self.config.sigma)
-            random_array.append(random_val)
-
-        return np.array([(self.abg_pl(xi) + random_array[index]) * -1 for index, xi in enumerate(x_range)])
+        shadowing = self._shadowing("abg", len(x_range))
+        return np.array([(self.abg_pl(xi) + shadowing[index]) * -1 for index, xi in enumerate(x_range)])
 
     def ci_pg_array(self, x_range):
-        random_val = np.random.normal(0, self.config.sigma)
-        random_array = []
-
-        for i in range(0, len(x_range)):
-            if (i+1) % int(self.config.coherence_length) == 0:
-                random_val = np.random.normal(0, self.config.sigma)
-            random_array.append(random_val)
-
-        return np.array([(self.ci_pl(xi) + random_array[index]) * -1 for index, xi in enumerate(x_range)])
+        shadowing = self._shadowing("ci", len(x_range))
+        return np.array([(self.ci_pl(xi) + shadowing[index]) * -1 for index, xi in enumerate(x_range)])
 
     def ohu_pg_array(self, x_range):
         return np.array([self.ohu_pl(xi) * -1 for xi in x_range])
@@ -135,3 +131,75 @@ class ModelEngine:
 
     def ohr_pg_array(self, x_range):
         return np.array([self.ohr_pl(xi) * -1 for xi in x_range])
+
+class CurveCache:
+    """CurveCache is a bounded LRU cache of ModelEngine path loss curves. Each
+    entry is keyed on the model, the values of the config fields that model
+    reads (MODEL_PARAMETERS), the identity of x_range and, for the models with
+    shadow fading, the engine seed, so a change to one parameter only misses
+    for the models that depend on it. Path gain curves are derived from cached
+    path loss curves by negation. Without an engine seed, the ABG and CI
+    curves are random on every call and are never cached. Cached arrays are
+    read-only, and x_range must not be modified in place."""
+    def __init__(self, engine, maxsize=64):
+        self.engine = engine
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model, x_range, path_gain=False):
+        """Get the path loss (or path gain) curve of a model over x_range."""
+        if self.engine.seed is None and model in NOISY_MODELS:
+            self._count_miss()
+            if path_gain:
+                return getattr(self.engine, f"{model}_pg_array")(x_range)
+            return getattr(self.engine, f"{model}_pl_array")(x_range)
+
+        params = tuple(getattr(self.engine.config, name) for name in MODEL_PARAMETERS[model])
+        seed = self.engine.seed if model in NOISY_MODELS else None
+        key = (model, params, id(x_range), seed, path_gain)
+        curve = self._lookup(key, x_range)
+        if curve is not None:
+            self.hits += 1
+            prof.profiler.count("models.cache_hits")
+            return curve
+
+        path_loss = self._lookup(key[:-1] + (False,), x_range) if path_gain else None
+        if path_loss is None:
+            self._count_miss()
+            path_loss = getattr(self.engine, f"{model}_pl_array")(x_range)
+            path_loss.setflags(write=False)
+            self._store(key[:-1] + (False,), x_range, path_loss)
+        else:
+            self.hits += 1
+            prof.profiler.count("models.cache_hits")
+        if not path_gain:
+            return path_loss
+
+        curve = -path_loss
+        curve.setflags(write=False)
+        self._store(key, x_range, curve)
+        return curve
+
+    def clear(self):
+        self.entries.clear()
+
+    def _lookup(self, key, x_range):
+        entry = self.entries.get(key)
+        # id() values can be reused once an array is freed, so check that the
+        # cached x_range is the same object.
+        if entry is None or entry[0] is not x_range:
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def _store(self, key, x_range, curve):
+        self.entries[key] = (x_range, curve)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def _count_miss(self):
+        self.misses += 1
+        prof.profiler.count("models.cache_misses")
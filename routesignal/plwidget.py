@@ -1,4 +1,5 @@
 import numpy as np
+import routesignal.models as md
 from PyQt5 import QtGui, QtCore
 from pyqtgraph import PlotWidget, mkPen, LegendItem
 
@@ -21,6 +22,7 @@ class PLWidget(PlotWidget):
         self.y_range = [randint(0,100) for _ in self.x_range]
 
         self.engine = engine
+        self.cache = md.CurveCache(engine)
         self.lines = lines
         self.pens = {}
 
@@ -97,24 +99,12 @@ class PLWidget(PlotWidget):
         legend.setParentItem(self.plotItem)
 
     def update(self, distances, cell, path_gain=False):
+        for model in md.MODEL_PARAMETERS:
+            self.lines[model].setData(self.x_range, self.cache.get(model, self.x_range, path_gain))
         if path_gain:
-            self.lines['fs'].setData(self.x_range, self.engine.fs_pg_array(self.x_range))
-            self.lines['tworay'].setData(self.x_range, self.engine.tworay_pg_array(self.x_range))
-            self.lines['ci'].setData(self.x_range, self.engine.ci_pg_array(self.x_range))
-            self.lines['abg'].setData(self.x_range, self.engine.abg_pg_array(self.x_range))
-            self.lines['ohu'].setData(self.x_range, self.engine.ohu_pg_array(self.x_range))
-            self.lines['ohs'].setData(self.x_range, self.engine.ohs_pg_array(self.x_range))
-            self.lines['ohr'].setData(self.x_range, self.engine.ohr_pg_array(self.x_range))
             self.lines['measured'].setData(distances, [element * -1 for element in cell.pathloss])
             self.setLabel('left', "Path Gain (dB)", **self.styles)
         else:
-            self.lines['fs'].setData(self.x_range, self.engine.fs_pl_array(self.x_range))
-            self.lines['tworay'].setData(self.x_range, self.engine.tworay_pl_array(self.x_range))
-            self.lines['ci'].setData(self.x_range, self.engine.ci_pl_array(self.x_range))
-            self.lines['abg'].setData(self.x_range, self.engine.abg_pl_array(self.x_range))
-            self.lines['ohu'].setData(self.x_range, self.engine.ohu_pl_array(self.x_range))
-            self.lines['ohs'].setData(self.x_range, self.engine.ohs_pl_array(self.x_range))
-            self.lines['ohr'].setData(self.x_range, self.engine.ohr_pl_array(self.x_range))
             self.lines['measured'].setData(distances, cell.pathloss)
             self.setLabel('left', "Path Loss (dB)", **self.styles)
 
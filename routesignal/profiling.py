@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import threading
+import functools
+import tracemalloc
+from contextlib import nullcontext
+
+class SpanRecord:
+    """Class containing a single completed timing span. Times are in seconds
+    relative to the start of profiling. memory is how far traced memory rose
+    above its level when the span opened, in bytes, i.e. the span's own
+    working set. peak_memory is the highest total traced memory reached while
+    the span was open: it counts every allocation still live since tracing
+    began, not only the span's own."""
+    def __init__(self, name, start, duration, peak_memory, thread, args, memory=None):
+        self.name = name
+        self.start = start
+        self.duration = duration
+        self.memory = memory
+        self.peak_memory = peak_memory
+        self.thread = thread
+        self.args = args
+
+class SpanStats:
+    """Class containing the running totals for all spans with one name."""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.memory = 0
+        self.peak_memory = 0
+
+    def add(self, record):
+        self.count += 1
+        self.total += record.duration
+        self.last = record.duration
+        if record.memory is not None:
+            self.memory = max(self.memory, record.memory)
+        if record.peak_memory is not None:
+            self.peak_memory = max(self.peak_memory, record.peak_memory)
+
+class _Span:
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.entry_memory = self.profiler._enter_memory()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        peak_memory = self.profiler._exit_memory(self.entry_memory)
+        memory = None if peak_memory is None else max(0, peak_memory - self.entry_memory)
+        self.profiler._record(SpanRecord(self.name, self.start - self.profiler.epoch,
+            end - self.start, peak_memory, threading.get_ident(), self.args, memory))
+        return False
+
+_DISABLED_SPAN = nullcontext()
+
+class Profiler:
+    """Profiler records named timing spans and counters. While disabled, span()
+    returns a shared no-op context manager and count() returns immediately, so
+    instrumented code pays a single attribute check. When trace_memory is set,
+    each span also records how much traced memory grew while it was open, and
+    the peak total (see SpanRecord), at the cost of running tracemalloc for the whole profiling
+    session; tracemalloc is only stopped on disable() if enable() started it.
+    Nested spans are tracked per thread. Completed spans can be exported in the
+    Chrome trace event format, which loads in chrome://tracing or Perfetto."""
+    def __init__(self, max_events=100000):
+        self.enabled = False
+        self.trace_memory = False
+        self.max_events = max_events
+        self.epoch = time.perf_counter()
+        self.events = []
+        self.counter_events = []
+        self.counters = {}
+        self.stats = {}
+        self._local = threading.local()
+        self._stacks = []
+        self._started_tracing = False
+        self._lock = threading.Lock()
+
+    def enable(self, trace_memory=True):
+        if self.enabled:
+            return
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        # Leave tracemalloc running if something else started it.
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracing = False
+        with self._lock:
+            self._local = threading.local()
+            self._stacks = []
+
+    def clear(self):
+        with self._lock:
+            self.epoch = time.perf_counter()
+            self.events.clear()
+            self.counter_events.clear()
+            self.counters.clear()
+            self.stats.clear()
+
+    def span(self, name, **args):
+        """Get a context manager that times the enclosed block as a span."""
+        if not self.enabled:
+            return _DISABLED_SPAN
+        return _Span(self, name, args)
+
+    def timed(self, name):
+        """Decorator that times every call to the wrapped function as a span."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, name, {}):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1):
+        """Add value to the named counter."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            if len(self.counter_events) < self.max_events:
+                self.counter_events.append((name, time.perf_counter() - self.epoch,
+                    self.counters[name]))
+
+    def summary(self):
+        """Get a list of (name, SpanStats) pairs, slowest total first."""
+        with self._lock:
+            return sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True)
+
+    def format_summary(self, limit=12):
+        lines = []
+        for name, stats in self.summary()[:limit]:
+            line = f"{name}: {stats.last * 1000:.1f} ms (n={stats.count}, total {stats.total * 1000:.0f} ms)"
+            if self.trace_memory:
+                line += f", +{stats.memory / 1048576:.1f} MiB (peak {stats.peak_memory / 1048576:.1f})"
+            lines.append(line)
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name} = {value}")
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, path):
+        """Write all recorded spans and counters to path as Chrome trace
+        JSON."""
+        pid = os.getpid()
+        with self._lock:
+            trace = []
+            for record in self.events:
+                args = dict(record.args)
+                if record.peak_memory is not None:
+                    args["memory_bytes"] = record.memory
+                    args["peak_memory_bytes"] = record.peak_memory
+                trace.append({
+                    "name": record.name,
+                    "cat": record.name.split(".", 1)[0],
+                    "ph": "X",
+                    "ts": record.start * 1e6,
+                    "dur": record.duration * 1e6,
+                    "pid": pid,
+                    "tid": record.thread,
+                    "args": args,
+                })
+            for name, timestamp, value in self.counter_events:
+                trace.append({
+                    "name": name,
+                    "ph": "C",
+                    "ts": timestamp * 1e6,
+                    "pid": pid,
+                    "args": {name: value},
+                })
+        with open(path, "w") as stream:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, stream)
+
+    def _memory_stack(self):
+        local = self._local
+        if not hasattr(local, "stack"):
+            local.stack = []
+            with self._lock:
+                self._stacks.append(local.stack)
+        return local.stack
+
+    def _enter_memory(self):
+        if not (self.trace_memory and tracemalloc.is_tracing()):
+            return None
+        # The traced peak is process-wide, so fold the peak seen so far into
+        # the innermost open span of every thread before resetting it;
+        # otherwise a nested span, or a span on another thread, would hide it.
+        stack = self._memory_stack()
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            for open_spans in self._stacks:
+                if open_spans:
+                    open_spans[-1] = max(open_spans[-1], peak)
+            tracemalloc.reset_peak()
+            stack.append(0)
+        return current
+
+    def _exit_memory(self, token):
+        stack = self._memory_stack()
+        if token is None or not tracemalloc.is_tracing() or not stack:
+            return None
+        with self._lock:
+            peak = max(stack.pop(), tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1] = max(stack[-1], peak)
+        return peak
+
+    def _record(self, record):
+        with self._lock:
+            if len(self.events) < self.max_events:
+                self.events.append(record)
+            self.stats.setdefault(record.name, SpanStats()).add(record)
+
+profiler = Profiler()
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ("mcc", "mnc", "lac", "act", "tac", "pci")
+
+RANGE_COLUMNS = ("rating", "speed")
+
+class CategoricalIndex:
+    """Class containing the categorical codes of a column and, for each
+    distinct value, the sorted row positions holding it. Positions are grouped
+    by code, so a value lookup is a single slice."""
+    def __init__(self, values):
+        codes, self.uniques = pd.factorize(values, sort=True)
+        # Missing values get code -1; shift so they land in bucket 0. The
+        # smallest code dtype lets argsort use a radix sort.
+        self.codes = (codes + 1).astype(np.min_scalar_type(len(self.uniques)))
+        self.order = np.argsort(self.codes, kind="stable")
+        counts = np.bincount(self.codes, minlength=len(self.uniques) + 1)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.lookup = {value: code + 1 for code, value in enumerate(self.uniques)}
+
+    def _codes(self, values):
+        values = values if isinstance(values, (list, tuple, set, np.ndarray)) else [values]
+        return [self.lookup[value] for value in values if value in self.lookup]
+
+    def count(self, values):
+        return sum(self.offsets[code + 1] - self.offsets[code] for code in self._codes(values))
+
+    def positions(self, values):
+        codes = self._codes(values)
+        positions = [self.order[self.offsets[code]:self.offsets[code + 1]] for code in codes]
+        if len(positions) == 1:
+            return positions[0]
+        return np.sort(np.concatenate(positions)) if positions else np.array([], dtype=np.intp)
+
+    def contains(self, positions, values):
+        return np.isin(self.codes[positions], self._codes(values))
+
+class RangeIndex:
+    """Class containing the row positions of a numeric column sorted by value,
+    so an inclusive [lo, hi] range resolves with two searchsorted calls. Either
+    bound may be None."""
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=float)
+        self.order = np.argsort(self.values)
+        self.sorted = self.values[self.order]
+        self.valid = np.count_nonzero(~np.isnan(self.values))
+
+    def _bounds(self, bounds):
+        lo, hi = bounds
+        start = 0 if lo is None else np.searchsorted(self.sorted[:self.valid], lo, side="left")
+        end = self.valid if hi is None else np.searchsorted(self.sorted[:self.valid], hi, side="right")
+        return start, max(start, end)
+
+    def count(self, bounds):
+        start, end = self._bounds(bounds)
+        return end - start
+
+    def positions(self, bounds):
+        start, end = self._bounds(bounds)
+        return np.sort(self.order[start:end])
+
+    def contains(self, positions, bounds):
+        lo, hi = bounds
+        values = self.values[positions]
+        mask = ~np.isnan(values)
+        if lo is not None:
+            mask &= values >= lo
+        if hi is not None:
+            mask &= values <= hi
+        return mask
+
+class PositionSet:
+    """Class wrapping a sorted array of row positions, such as a Session's, so
+    it can take part in a query like any other index."""
+    def __init__(self, positions):
+        self.sorted = np.asarray(positions)
+
+    def count(self, _):
+        return len(self.sorted)
+
+    def positions(self, _):
+        return self.sorted
+
+    def contains(self, positions, _):
+        index = np.searchsorted(self.sorted, positions)
+        found = index < len(self.sorted)
+        found[found] = self.sorted[index[found]] == positions[found]
+        return found
+
+def build_indexes(data):
+    """Build a CategoricalIndex or RangeIndex for each indexed column."""
+    indexes = {column: CategoricalIndex(data[column].to_numpy()) for column in CATEGORICAL_COLUMNS}
+    indexes.update({column: RangeIndex(data[column].to_numpy()) for column in RANGE_COLUMNS})
+    return indexes
+
+def resolve(terms):
+    """Get the sorted row positions matching every (index, predicate) term.
+    The most selective term provides the candidate positions, which the others
+    then filter, so no term ever scans the whole table."""
+    terms = sorted(terms, key=lambda term: term[0].count(term[1]))
+    index, predicate = terms[0]
+    positions = index.positions(predicate)
+    for index, predicate in terms[1:]:
+        if len(positions) == 0:
+            break
+        positions = positions[index.contains(positions, predicate)]
+    return positions
@@ -0,0 +1,159 @@
+import types
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import routesignal.models as md
+import routesignal.profiling as prof
+
+SWEEP_PARAMETERS = (
+    "freq",
+    "alpha",
+    "beta",
+    "gamma",
+    "pl_exp",
+    "ref_dist",
+    "tx_power",
+    "tx_gain",
+    "rx_gain",
+    "bs_height",
+    "ue_height",
+)
+
+MODELS = ("fs", "tworay", "abg", "ci", "ohu", "ohs", "ohr")
+
+class SweepResult:
+    """Class containing the RMSE and bias (model minus measured path loss, in
+    dB) of each model for every scored parameter combination. index holds the
+    position of each combination in the full sweep, which only differs from
+    range(len(self)) when the sweep kept its top_k combinations."""
+    def __init__(self, params, rmse, bias, index=None):
+        self.params = params
+        self.rmse = rmse
+        self.bias = bias
+        self.index = np.arange(len(self)) if index is None else index
+
+    def __len__(self):
+        return len(next(iter(self.params.values())))
+
+    def best(self, model):
+        """Get the parameter combination with the lowest RMSE for a model."""
+        index = np.nanargmin(self.rmse[model])
+        best = {name: values[index] for name, values in self.params.items()}
+        best["rmse"] = self.rmse[model][index]
+        best["bias"] = self.bias[model][index]
+        return best
+
+    def to_frame(self):
+        frame = pd.DataFrame(self.params, index=self.index)
+        for model in self.rmse:
+            frame[f"{model}_rmse"] = self.rmse[model]
+            frame[f"{model}_bias"] = self.bias[model]
+        return frame
+
+class SweepEngine:
+    """SweepEngine evaluates ModelEngine models over ranges or grids of Config
+    parameters. Each swept parameter becomes a column vector, so a model is
+    evaluated once per chunk as a (parameters x distances) broadcast instead of
+    once per combination. Only the parameter axes are passed around; each
+    chunk generates its own combinations from a range of flat grid indices,
+    sized so no broadcast tensor exceeds max_bytes. Chunks are spread across a
+    process pool of the given number of workers. If top_k is given, each chunk
+    only returns its top_k lowest-RMSE combinations per model, so the result
+    stays small however large the grid is."""
+    def __init__(self, config, workers=None, max_bytes=64 * 1024 * 1024, top_k=None):
+        self.config = config
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.top_k = top_k
+
+    def run(self, ground_distances, signal, params, models=MODELS, grid=True):
+        """Score each model against measured signal power (dBm) at the given
+        ground distances (m) from the tower. params maps parameter names to
+        value sequences, combined as a cartesian grid, or pairwise when grid is
+        False."""
+        ground_distances = np.asarray(ground_distances, dtype=float)
+        signal = np.asarray(signal, dtype=float)
+        axes = self._axes(params, grid)
+        count = int(np.prod([len(axis) for axis in axes.values()])) if grid else len(next(iter(axes.values())))
+        chunk_size = max(1, self.max_bytes // (8 * max(1, ground_distances.size)))
+        snapshot = {name: value for name, value in vars(self.config).items()
+                if value is None or np.isscalar(value)}
+
+        args = [(snapshot, axes, grid, start, min(start + chunk_size, count), ground_distances,
+            signal, models, self.top_k) for start in range(0, count, chunk_size)]
+        with prof.profiler.span("sweep.run", combinations=count, chunks=len(args)):
+            if self.workers == 1 or len(args) == 1:
+                scores = [_score(*arg) for arg in args]
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    scores = list(executor.map(_score, *zip(*args)))
+
+        index = np.concatenate([score[0] for score in scores])
+        rmse = {model: np.concatenate([score[1][model] for score in scores]) for model in models}
+        bias = {model: np.concatenate([score[2][model] for score in scores]) for model in models}
+        if self.top_k is not None:
+            keep = _top_k(rmse, self.top_k)
+            index = index[keep]
+            rmse = {model: values[keep] for model, values in rmse.items()}
+            bias = {model: values[keep] for model, values in bias.items()}
+        return SweepResult(_params_at(axes, grid, index), rmse, bias, index)
+
+    def run_cell(self, dataset, cellid, params, models=MODELS, grid=True):
+        """Score each model against a cell's measurements, using the tower
+        position from the config."""
+        ground_distances = dataset.get_distances(cellid, self.config.tower_lat,
+                self.config.tower_lon, 0)
+        signal = dataset.get_signal_power(cellid)
+        return self.run(ground_distances, signal, params, models, grid)
+
+    def _axes(self, params, grid):
+        if not params:
+            raise ValueError(f"No parameters to sweep, expected some of {SWEEP_PARAMETERS}")
+        for name in params:
+            if name not in SWEEP_PARAMETERS:
+                raise ValueError(f"Cannot sweep {name}, expected one of {SWEEP_PARAMETERS}")
+        axes = {name: np.atleast_1d(np.asarray(value, dtype=float)).ravel() for name, value in params.items()}
+        for name, axis in axes.items():
+            if not len(axis):
+                raise ValueError(f"No values to sweep for {name}")
+        if not grid and len(set(len(axis) for axis in axes.values())) > 1:
+            raise ValueError("Parameter sequences must be the same length when grid is False")
+        return axes
+
+def _params_at(axes, grid, index):
+    """Get the parameter values of the combinations at flat sweep indices."""
+    if not grid:
+        return {name: axis[index] for name, axis in axes.items()}
+    positions = np.unravel_index(index, [len(axis) for axis in axes.values()])
+    return {name: axis[position] for (name, axis), position in zip(axes.items(), positions)}
+
+def _top_k(rmse, k):
+    """Get the sorted positions holding the k lowest RMSEs of any model."""
+    keep = [np.argsort(values, kind="stable")[:k] for values in rmse.values()]
+    return np.unique(np.concatenate(keep))
+
+def _score(snapshot, axes, grid, start, stop, ground_distances, signal, models, top_k=None):
+    index = np.arange(start, stop)
+    chunk = _params_at(axes, grid, index)
+    config = types.SimpleNamespace(**snapshot)
+    for name, values in chunk.items():
+        setattr(config, name, values[:, np.newaxis])
+    engine = md.ModelEngine(config)
+    count = len(index)
+
+    distances = np.sqrt(np.square(config.bs_height) + np.square(ground_distances))
+    measured = config.tx_power - signal - config.tx_gain - config.rx_gain
+
+    rmse = {}
+    bias = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for model in models:
+            residual = getattr(engine, f"{model}_pl")(distances) - measured
+            rmse[model] = np.broadcast_to(np.sqrt(np.mean(np.square(residual), axis=-1)), count)
+            bias[model] = np.broadcast_to(np.mean(residual, axis=-1), count)
+    if top_k is not None:
+        keep = _top_k(rmse, top_k)
+        index = index[keep]
+        rmse = {model: values[keep] for model, values in rmse.items()}
+        bias = {model: values[keep] for model, values in bias.items()}
+    return index, rmse, bias
@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+import os
+import argparse
+import yaml
+import numpy as np
+import pandas as pd
+import routesignal.profiling as prof
+import routesignal.utils as utils
+
+RADIO_TYPES = ("GSM", "UMTS", "CDMA", "LTE", "NR")
+
+AREA_FREE_RADIO_CODES = [RADIO_TYPES.index("LTE"), RADIO_TYPES.index("NR")]
+
+CELL_BITS = 44
+
+FIELDS = ("keys", "area", "lat", "lon", "range", "samples", "radio", "lat_order", "lat_sorted")
+
+def make_keys(mcc, mnc, cellid):
+    """Pack mcc, mnc and cellid into uint64 lookup keys. mcc * 1000 + mnc fits
+    in the top 20 bits, leaving 44 bits for cell ids, which covers the 36-bit
+    NR cell identity."""
+    plmn = np.asarray(mcc, dtype=np.uint64) * np.uint64(1000) + np.asarray(mnc, dtype=np.uint64)
+    cell = np.asarray(cellid, dtype=np.uint64) & np.uint64((1 << CELL_BITS) - 1)
+    return (plmn << np.uint64(CELL_BITS)) | cell
+
+def split_keys(keys):
+    plmn = keys >> np.uint64(CELL_BITS)
+    return plmn // 1000, plmn % 1000, keys & np.uint64((1 << CELL_BITS) - 1)
+
+def import_towers(csv_path, index_dir, chunksize=1000000):
+    """Convert an OpenCellID cell_towers.csv dump (optionally compressed) into
+    a TowerDB index directory. Rows are sorted by (key, area) so that lookups
+    are a searchsorted over the keys, and a latitude ordering is stored for
+    spatial queries."""
+    columns = {"radio": str, "mcc": np.uint16, "net": np.uint16, "area": np.uint32,
+            "cell": np.uint64, "lon": np.float64, "lat": np.float64,
+            "range": np.float64, "samples": np.float64}
+    parts = []
+    with prof.profiler.span("towerdb.read"):
+        for chunk in pd.read_csv(csv_path, usecols=list(columns), dtype=columns,
+                chunksize=chunksize):
+            parts.append({
+                "keys": make_keys(chunk["mcc"].to_numpy(), chunk["net"].to_numpy(), chunk["cell"].to_numpy()),
+                "area": chunk["area"].to_numpy(dtype=np.uint32),
+                "lat": chunk["lat"].to_numpy(dtype=np.float32),
+                "lon": chunk["lon"].to_numpy(dtype=np.float32),
+                "range": chunk["range"].fillna(0).clip(0, np.iinfo(np.uint32).max).to_numpy(dtype=np.uint32),
+                "samples": chunk["samples"].fillna(0).clip(0, np.iinfo(np.uint32).max).to_numpy(dtype=np.uint32),
+                "radio": pd.Categorical(chunk["radio"], categories=RADIO_TYPES).codes.astype(np.int8),
+            })
+            prof.profiler.count("towerdb.rows", len(chunk))
+
+    with prof.profiler.span("towerdb.sort"):
+        arrays = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        del parts
+        order = np.lexsort((arrays["area"], arrays["keys"]))
+        arrays = {name: values[order] for name, values in arrays.items()}
+        arrays["lat_order"] = np.argsort(arrays["lat"], kind="stable").astype(np.uint32)
+        arrays["lat_sorted"] = arrays["lat"][arrays["lat_order"]]
+
+    os.makedirs(index_dir, exist_ok=True)
+    with prof.profiler.span("towerdb.write"):
+        for name in FIELDS:
+            np.save(os.path.join(index_dir, name + ".npy"), arrays[name])
+        with open(os.path.join(index_dir, "meta.yaml"), "w") as stream:
+            yaml.dump({"source": os.path.abspath(csv_path), "count": int(len(arrays["keys"])),
+                "radio_types": list(RADIO_TYPES)}, stream)
+    return TowerDB(index_dir)
+
+class TowerDB:
+    """Class providing offline lookups against an index directory built by
+    import_towers. The arrays are memory-mapped, so opening the database reads
+    nothing up front and each query only touches the pages it searches."""
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        for name in FIELDS:
+            setattr(self, name, np.load(os.path.join(index_dir, name + ".npy"), mmap_mode="r"))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, mcc, mnc, area, cellid):
+        """Get the row of each (mcc, mnc, area, cellid) in the database, or -1
+        where it is missing. Cell ids are unique per network for LTE and NR,
+        so an LTE or NR row with the key is still accepted when no row matches
+        the area exactly. GSM and UMTS cell ids are reused across areas, so
+        their rows must match the area."""
+        keys = make_keys(mcc, mnc, cellid)
+        area = np.asarray(area, dtype=np.uint32)
+        if len(self.keys) == 0:
+            return np.full(len(keys), -1)
+        lo = np.searchsorted(self.keys, keys, side="left")
+        hi = np.searchsorted(self.keys, keys, side="right")
+        safe = np.minimum(lo, len(self.keys) - 1)
+        area_free = np.isin(np.asarray(self.radio[safe]), AREA_FREE_RADIO_CODES)
+        matched = (hi - lo == 1) & ((np.asarray(self.area[safe]) == area) | area_free)
+        rows = np.where(matched, lo, -1)
+
+        # Duplicate keys (GSM/UMTS cell ids reused across areas) are rare, so
+        # resolve them individually.
+        for position in np.flatnonzero(hi - lo > 1):
+            areas = np.asarray(self.area[lo[position]:hi[position]])
+            match = np.flatnonzero(areas == area[position])
+            if not len(match):
+                radios = np.asarray(self.radio[lo[position]:hi[position]])
+                match = np.flatnonzero(np.isin(radios, AREA_FREE_RADIO_CODES))
+            if len(match):
+                rows[position] = lo[position] + match[0]
+        return rows
+
+    def get_rows(self, rows):
+        """Get a DataFrame of tower details for database rows, with NaN
+        positions where a row is -1."""
+        rows = np.asarray(rows)
+        found = rows >= 0
+        safe = np.where(found, rows, 0)
+        mcc, mnc, cell = split_keys(np.asarray(self.keys[safe]))
+        frame = pd.DataFrame({
+            "mcc": mcc.astype(np.int64),
+            "mnc": mnc.astype(np.int64),
+            "area": np.asarray(self.area[safe]).astype(np.int64),
+            "cellid": cell.astype(np.int64),
+            "radio": pd.Categorical.from_codes(np.asarray(self.radio[safe]), categories=RADIO_TYPES),
+            "lat": np.where(found, self.lat[safe], np.nan),
+            "lon": np.where(found, self.lon[safe], np.nan),
+            "range": np.asarray(self.range[safe]),
+            "samples": np.asarray(self.samples[safe]),
+            "found": found,
+        })
+        return frame
+
+    def lookup_dataset(self, dataset):
+        """Get the tower details of every (mcc, mnc, lac, cellid) seen in a
+        Dataset or DataView as a DataFrame indexed by cellid, with the lac it
+        was seen under. A cell seen under several networks or areas has one
+        row for each."""
+        with prof.profiler.span("towerdb.lookup", cells=len(dataset.unique_cellids)):
+            cells = dataset.data.drop_duplicates(["mcc", "mnc", "lac", "cellid"])
+            rows = self.lookup(cells["mcc"].to_numpy(), cells["mnc"].to_numpy(),
+                    cells["lac"].to_numpy(), cells["cellid"].to_numpy())
+            frame = self.get_rows(rows)
+            frame["lac"] = cells["lac"].to_numpy()
+            frame.index = cells["cellid"].to_numpy()
+        return frame
+
+    def within(self, extent):
+        """Get the towers inside extent, given as (lon_min, lon_max, lat_min,
+        lat_max) as in bbox.txt."""
+        lon_min, lon_max, lat_min, lat_max = extent
+        candidates = self._lat_band(lat_min, lat_max)
+        lons = np.asarray(self.lon[candidates])
+        return self.get_rows(np.sort(candidates[(lons >= lon_min) & (lons <= lon_max)]))
+
+    def nearest(self, lat, lon, k=5, max_distance_km=20):
+        """Get up to k towers nearest to (lat, lon) within max_distance_km,
+        closest first, with a distance_km column."""
+        dlat = np.degrees(max_distance_km / utils.EARTH_RADIUS_KM)
+        dlon = dlat / max(np.cos(np.radians(lat)), 1e-6)
+        candidates = self._lat_band(lat - dlat, lat + dlat)
+        lons = np.asarray(self.lon[candidates], dtype=float)
+        candidates = candidates[np.abs(lons - lon) <= dlon]
+
+        distances = utils.get_haversine_distance(lat, lon, np.asarray(self.lat[candidates], dtype=float),
+                np.asarray(self.lon[candidates], dtype=float))
+        inside = distances <= max_distance_km
+        candidates, distances = candidates[inside], distances[inside]
+        if len(candidates) > k:
+            closest = np.argpartition(distances, k)[:k]
+            candidates, distances = candidates[closest], distances[closest]
+        order = np.argsort(distances)
+        frame = self.get_rows(candidates[order])
+        frame["distance_km"] = distances[order]
+        return frame
+
+    def nearest_to_extent(self, extent, k=5):
+        """Get up to k towers nearest to the centre of a map extent, searching
+        out to the extent's half-diagonal plus a margin of the same size."""
+        lon_min, lon_max, lat_min, lat_max = extent
+        lat = (lat_min + lat_max) / 2
+        lon = (lon_min + lon_max) / 2
+        return self.nearest(lat, lon, k, 2 * utils.get_haversine_distance(lat, lon, lat_max, lon_max))
+
+    def _lat_band(self, lat_min, lat_max):
+        lo = np.searchsorted(self.lat_sorted, lat_min, side="left")
+        hi = np.searchsorted(self.lat_sorted, lat_max, side="right")
+        return np.asarray(self.lat_order[lo:hi], dtype=np.int64)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an offline tower index from an OpenCellID cell_towers.csv dump.")
+    parser.add_argument("csv", help="path to cell_towers.csv or cell_towers.csv.gz")
+    parser.add_argument("index_dir", help="directory to write the index to")
+    parser.add_argument("--chunksize", type=int, default=1000000)
+    args = parser.parse_args()
+
+    db = import_towers(args.csv, args.index_dir, args.chunksize)
+    print(f"Indexed {len(db)} towers into {args.index_dir}")
+
+if __name__ == "__main__":
+    main()
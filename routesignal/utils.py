@@ -1,11 +1,14 @@
 import csv
 import math
+import numpy as np
 import utm
 import os
 import yaml
 from geopy import distance
 from dataclasses import dataclass
 
+EARTH_RADIUS_KM = 6371.0088
+
 class Config:
     def __init__(self, filename="lastcfg.yaml"):
 
@@ -69,3 +72,9 @@ def get_distance(lat1, lon1, lat2, lon2):
 
 def get_great_circle_distance(p1, p2):
     return distance.great_circle(p1, p2)
+
+def get_haversine_distance(lat1, lon1, lat2, lon2):
+    """Vectorized great-circle distance in km between arrays of points."""
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    a = np.square(np.sin((lat2 - lat1) / 2)) + np.cos(lat1) * np.cos(lat2) * np.square(np.sin((lon2 - lon1) / 2))
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
@@ -0,0 +1,108 @@
+import unittest
+import os
+import glob
+import numpy as np
+import pandas as pd
+import routesignal.dataset as ds
+import routesignal.cleaning as cln
+
+TESTDATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'carling')
+
+def make_track(count, step_deg=0.00005, dt_ms=5000, speed=1.5):
+    return pd.DataFrame({
+        'cellid': np.full(count, 7),
+        'lat': 45.35 + step_deg * np.arange(count),
+        'lon': np.full(count, -75.81),
+        'measured_at': 1600000000000 + dt_ms * np.arange(count),
+        'rating': np.full(count, 10.0),
+        'speed': np.full(count, speed),
+    })
+
+class TestCleaner(unittest.TestCase):
+    def test_clean_track_untouched(self):
+        data = make_track(20)
+        cleaner = cln.Cleaner()
+        cleaned = cleaner.clean(data)
+        self.assertTrue(cleaned.equals(data))
+        self.assertEqual(cleaner.counters['kept'], 20)
+
+    def test_duplicates(self):
+        data = make_track(5)
+        data = pd.concat([data, data.iloc[[2]]]).sort_values('measured_at', kind='stable', ignore_index=True)
+        # Another cell seen in the same fix is not a duplicate.
+        extra = data.iloc[[0]].assign(cellid=8)
+        data = pd.concat([extra, data], ignore_index=True)
+        cleaner = cln.Cleaner()
+        cleaned = cleaner.clean(data)
+        self.assertEqual(cleaner.counters['duplicates'], 1)
+        self.assertEqual(len(cleaned), 6)
+        self.assertFalse(cleaned.duplicated(['cellid', 'measured_at']).any())
+
+    def test_single_jump_dropped(self):
+        data = make_track(10)
+        data.loc[4, 'lat'] += 0.01
+        cleaner = cln.Cleaner()
+        cleaned = cleaner.clean(data)
+        self.assertEqual(cleaner.counters['jumps'], 1)
+        self.assertNotIn(data.loc[4, 'lat'], cleaned['lat'].to_numpy())
+        self.assertEqual(len(cleaned), 9)
+
+    def test_jump_next_to_endpoint(self):
+        for index in (0, 1, 8, 9):
+            data = make_track(10)
+            data.loc[index, 'lat'] += 0.01
+            cleaner = cln.Cleaner()
+            cleaned = cleaner.clean(data)
+            self.assertEqual(cleaner.counters['jumps'], 1, index)
+            self.assertTrue(cleaned.equals(data.drop(index).reset_index(drop=True)), index)
+
+    def test_two_fix_drive_kept(self):
+        data = make_track(2)
+        data.loc[1, 'lat'] += 0.01
+        cleaner = cln.Cleaner()
+        self.assertEqual(len(cleaner.clean(data)), 2)
+        self.assertEqual(cleaner.counters['jumps'], 0)
+
+    def test_jump_after_gap_kept(self):
+        data = make_track(10)
+        data.loc[5:, 'measured_at'] += 3600 * 1000
+        data.loc[5:, 'lat'] += 0.05
+        cleaner = cln.Cleaner()
+        self.assertEqual(len(cleaner.clean(data)), 10)
+        self.assertEqual(cleaner.counters['jumps'], 0)
+
+    def test_stale_fixes(self):
+        data = make_track(10, speed=8.0)
+        data.loc[6, ['lat', 'lon']] = data.loc[5, ['lat', 'lon']].to_numpy()
+        cleaner = cln.Cleaner()
+        cleaned = cleaner.clean(data)
+        self.assertEqual(cleaner.counters['stale'], 1)
+        self.assertEqual(len(cleaned), 9)
+
+        # A stationary receiver reporting no speed keeps its repeated fixes.
+        stationary = make_track(10, step_deg=0, speed=0)
+        self.assertEqual(len(cln.Cleaner().clean(stationary)), 10)
+
+    def test_rating_bounds(self):
+        data = make_track(6)
+        data['rating'] = [4.0, 10.0, 50.0, 200.0, np.nan, 12.0]
+        cleaner = cln.Cleaner(max_rating=40, check_jumps=False, drop_stale=False)
+        cleaned = cleaner.clean(data)
+        self.assertEqual(cleaner.counters['rating'], 2)
+        np.testing.assert_array_equal(cleaned['rating'].to_numpy(), [4.0, 10.0, np.nan, 12.0])
+
+class TestDatasetCleaning(unittest.TestCase):
+    def test_dataset_report(self):
+        files = sorted(glob.glob(os.path.join(TESTDATA_DIR, '*.csv')))
+        raw = ds.Dataset(files)
+        cleaned = ds.Dataset(files, cleaner=cln.Cleaner(max_rating=100))
+        report = cleaned.cleaning_report
+        self.assertEqual(raw.cleaning_report, {})
+        self.assertEqual(report['input'], len(raw.data))
+        self.assertEqual(report['kept'], len(cleaned.data))
+        self.assertGreater(report['rating'], 0)
+        self.assertTrue(np.all(np.diff(cleaned.timestamps) >= 0))
+        self.assertEqual(cleaned.session_ends[-1], len(cleaned.data))
+
+if __name__ == '__main__':
+    unittest.main()
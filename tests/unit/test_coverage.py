@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+import routesignal.config as cfg
+import routesignal.dataset as ds
+import routesignal.models as md
+import routesignal.utils as utils
+import routesignal.profiling as prof
+from routesignal.coverage import CoverageEngine
+
+EXTENT = (-75.8232, -75.7925, 45.3422, 45.3590)
+
+class TestCoverageEngine(unittest.TestCase):
+    def setUp(self):
+        self.config = cfg.Config("nonexistent.yaml")
+        self.config.freq = 800
+        self.config.tx_power = 43
+        self.towers = [
+            ds.Tower(45.3450, -75.8150, "west", height=30),
+            ds.Tower(45.3560, -75.7980, "east", height=40, tx_power=46),
+        ]
+
+    def test_matches_model_at_pixel(self):
+        raster = CoverageEngine(self.config, workers=1).predict(self.towers[:1], EXTENT, (60, 80))
+        row, col = 20, 50
+        lat = EXTENT[3] - (row + 0.5) * (EXTENT[3] - EXTENT[2]) / 60
+        lon = EXTENT[0] + (col + 0.5) * (EXTENT[1] - EXTENT[0]) / 80
+        ground = utils.get_distance(self.towers[0].lat, self.towers[0].lon, lat, lon) * 1000
+        self.config.bs_height = 30
+        expected = self.config.tx_power - md.ModelEngine(self.config).ohu_pl(
+                np.sqrt(ground ** 2 + 30 ** 2))
+        self.assertAlmostEqual(float(raster.rx_power[row, col]), float(expected), places=1)
+
+    def test_tiles_match_single_tile(self):
+        whole = CoverageEngine(self.config, workers=1).predict(self.towers, EXTENT, (50, 70))
+        tiled = CoverageEngine(self.config, workers=2, max_bytes=8 * 70 * 7).predict(
+                self.towers, EXTENT, (50, 70))
+        np.testing.assert_array_equal(whole.best_server, tiled.best_server)
+        np.testing.assert_allclose(whole.rx_power, tiled.rx_power)
+        np.testing.assert_allclose(whole.sinr, tiled.sinr)
+
+    def test_one_tile_per_worker(self):
+        prof.profiler.enable(trace_memory=False)
+        try:
+            tiled = CoverageEngine(self.config, workers=3).predict(self.towers, EXTENT, (30, 50))
+        finally:
+            prof.profiler.disable()
+        tiles = [record.args["tiles"] for record in prof.profiler.events if record.name == "coverage.predict"]
+        prof.profiler.clear()
+        self.assertEqual(tiles, [3])
+        whole = CoverageEngine(self.config, workers=1).predict(self.towers, EXTENT, (30, 50))
+        np.testing.assert_allclose(whole.rx_power, tiled.rx_power)
+
+    def test_best_server_is_nearest_tower(self):
+        raster = CoverageEngine(self.config, workers=1).predict(self.towers, EXTENT, (40, 40))
+        self.assertEqual(raster.best_server[-1, 0], 0)
+        self.assertEqual(raster.best_server[0, -1], 1)
+        self.assertTrue(np.all(raster.sinr <= raster.rx_power + 104 + 1e-3))
+
+if __name__ == '__main__':
+    unittest.main()
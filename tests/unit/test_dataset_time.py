@@ -0,0 +1,51 @@
+import unittest
+import os
+import glob
+import datetime
+import numpy as np
+import routesignal.dataset as ds
+
+TESTDATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'lacolyoc')
+
+class TestDatasetTimeIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dataset = ds.Dataset(sorted(glob.glob(os.path.join(TESTDATA_DIR, '*.csv'))))
+
+    def test_sorted_by_time(self):
+        self.assertTrue(np.all(np.diff(self.dataset.timestamps) >= 0))
+
+    def test_time_range(self):
+        start = datetime.datetime(2020, 9, 1, tzinfo=datetime.timezone.utc)
+        end = datetime.datetime(2020, 10, 1, tzinfo=datetime.timezone.utc)
+        view = self.dataset.get_time_range(start, end)
+        measured_at = self.dataset.data['measured_at']
+        expected = ((measured_at >= start.timestamp() * 1000) &
+                (measured_at < end.timestamp() * 1000)).sum()
+        self.assertEqual(len(view.data), expected)
+
+    def test_float_epoch_ms(self):
+        start, end = self.dataset.timestamps[100], self.dataset.timestamps[200]
+        by_int = self.dataset.get_time_range(int(start), int(end))
+        by_float = self.dataset.get_time_range(float(start), np.float64(end))
+        self.assertGreater(len(by_int.data), 0)
+        self.assertTrue(by_float.data.equals(by_int.data))
+        with self.assertRaises(ValueError):
+            self.dataset.get_time_range(float("nan"), end)
+
+    def test_sessions(self):
+        sessions = [self.dataset.get_session(index) for index in
+                range(self.dataset.session_count())]
+        self.assertEqual(sum(len(session.data) for session in sessions), len(self.dataset.data))
+        for previous, session in zip(sessions, sessions[1:]):
+            self.assertGreater((session.start - previous.end).total_seconds(),
+                    self.dataset.session_gap)
+
+    def test_time_of_day(self):
+        view = self.dataset.get_time_of_day(datetime.time(14), datetime.time(16), tz='UTC')
+        self.assertGreater(len(view.data), 0)
+        hours = (view.data['measured_at'] // 3600000) % 24
+        self.assertTrue(np.all((hours >= 14) & (hours < 16)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import os
+import glob
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import routesignal.drift as dr
+
+TESTDATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'lacolyoc')
+
+class TestDrift(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.files = sorted(glob.glob(os.path.join(TESTDATA_DIR, '*.csv')))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_merge_matches_direct(self):
+        store = dr.AggregateStore(os.path.join(self.directory, 'store'))
+        merged = dr.combine(store.update(self.files), 'cell').to_frame()
+        data = pd.concat([pd.read_csv(path) for path in self.files])
+        direct = data.groupby('cellid')['signal'].agg(['count', 'mean', 'std'])
+        np.testing.assert_array_equal(merged.index, direct.index)
+        np.testing.assert_array_equal(merged['count'], direct['count'])
+        np.testing.assert_allclose(merged['mean'], direct['mean'])
+        np.testing.assert_allclose(merged['std'], direct['std'], equal_nan=True)
+
+        total = dr.combine(store.update(self.files), 'file')
+        self.assertEqual(total.count[0], len(data))
+
+    def test_store_reuses_aggregates(self):
+        path = os.path.join(self.directory, 'drive.csv')
+        shutil.copy(self.files[0], path)
+        store = dr.AggregateStore(os.path.join(self.directory, 'store'))
+        first = store.get(path)
+        filename = store._filename(path)
+        stored_mtime = os.stat(filename).st_mtime_ns
+        self.assertEqual(store.get(path).levels['bin'].count.sum(), first.levels['bin'].count.sum())
+        self.assertEqual(os.stat(filename).st_mtime_ns, stored_mtime)
+
+        data = pd.read_csv(path)
+        data.iloc[:10].to_csv(path, index=False)
+        self.assertEqual(store.get(path).levels['file'].count[0], 10)
+
+    def test_unreadable_aggregate_recomputed(self):
+        path = self.files[0]
+        store = dr.AggregateStore(os.path.join(self.directory, 'store'))
+        expected = store.get(path).levels['file'].count[0]
+        filename = store._filename(path)
+
+        # An aggregate stored before bin_deg was saved alongside it.
+        with np.load(filename) as stored:
+            arrays = {name: stored[name] for name in stored.files if name != 'bin_deg'}
+        with open(filename, 'wb') as stream:
+            np.savez(stream, **arrays)
+        self.assertEqual(store.get(path).levels['file'].count[0], expected)
+        self.assertEqual(dr.FileAggregate.load(filename)[0].bin_deg, store.bin_deg)
+
+        for contents in (b'', b'not an npz file'):
+            with open(filename, 'wb') as stream:
+                stream.write(contents)
+            self.assertEqual(store.get(path).levels['file'].count[0], expected)
+
+    def test_compare_detects_shift(self):
+        data = pd.read_csv(self.files[0])
+        before = os.path.join(self.directory, 'before.csv')
+        after = os.path.join(self.directory, 'after.csv')
+        data.to_csv(before, index=False)
+        cell = data['cellid'].value_counts().index[0]
+        data.loc[data['cellid'] == cell, 'signal'] -= 10
+        data.to_csv(after, index=False)
+
+        store = dr.AggregateStore(os.path.join(self.directory, 'store'))
+        frame = dr.compare(store.update([before]), store.update([after]), 'cell')
+        self.assertAlmostEqual(frame.loc[cell, 'difference'], -10)
+        self.assertLess(frame.loc[cell, 'p_value'], 1e-6)
+        unchanged = frame.drop(cell)
+        np.testing.assert_allclose(unchanged['difference'].dropna(), 0)
+
+        bins = dr.compare(store.update([before]), store.update([after]), 'bin')
+        self.assertTrue(np.all(np.abs(bins['lat'] - data['lat'].mean()) < 1))
+
+    def test_bin_size_travels_with_aggregates(self):
+        path = self.files[0]
+        coarse = dr.AggregateStore(os.path.join(self.directory, 'coarse'), bin_deg=0.01)
+        fine = dr.AggregateStore(os.path.join(self.directory, 'fine'), bin_deg=0.001)
+        self.assertEqual(dr.AggregateStore(coarse.directory, bin_deg=0.01).get(path).bin_deg, 0.01)
+
+        bins = dr.compare(coarse.update([path]), coarse.update([path]), 'bin')
+        data = pd.read_csv(path)
+        centers = (np.floor((data[['lat', 'lon']] + [90, 180]) / 0.01) + 0.5) * 0.01 - [90, 180]
+        centers = centers.drop_duplicates().sort_values(['lat', 'lon']).to_numpy()
+        np.testing.assert_allclose(bins.sort_values(['lat', 'lon'])[['lat', 'lon']].to_numpy(), centers)
+        with self.assertRaises(ValueError):
+            dr.compare(coarse.update([path]), fine.update([path]), 'bin')
+
+    def test_unknown_level(self):
+        with self.assertRaises(ValueError):
+            dr.combine([], 'tower')
+
+if __name__ == '__main__':
+    unittest.main()
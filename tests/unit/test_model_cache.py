@@ -0,0 +1,64 @@
+import unittest
+import numpy as np
+import routesignal.config as cfg
+import routesignal.models as md
+
+class TestCurveCache(unittest.TestCase):
+    def setUp(self):
+        self.config = cfg.Config("nonexistent.yaml")
+        self.config.sigma = 2
+        self.config.coherence_length = 5
+        self.x_range = np.arange(0.5, 500, 2)
+        self.engine = md.ModelEngine(self.config, seed=1234)
+        self.cache = md.CurveCache(self.engine)
+
+    def test_repeat_is_hit(self):
+        first = self.cache.get("ohu", self.x_range)
+        second = self.cache.get("ohu", self.x_range)
+        self.assertIs(first, second)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        np.testing.assert_allclose(first, self.engine.ohu_pl_array(self.x_range))
+
+    def test_only_dependent_models_miss(self):
+        for model in md.MODEL_PARAMETERS:
+            self.cache.get(model, self.x_range)
+        self.cache.misses = 0
+        self.config.pl_exp = 3
+        for model in md.MODEL_PARAMETERS:
+            self.cache.get(model, self.x_range)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_path_gain_is_negated_without_evaluation(self):
+        path_loss = self.cache.get("abg", self.x_range)
+        path_gain = self.cache.get("abg", self.x_range, path_gain=True)
+        self.assertEqual(self.cache.misses, 1)
+        np.testing.assert_array_equal(path_gain, -path_loss)
+        np.testing.assert_array_equal(path_gain, self.engine.abg_pg_array(self.x_range))
+
+    def test_bounded(self):
+        cache = md.CurveCache(self.engine, maxsize=3)
+        for freq in range(10, 20):
+            self.config.freq = freq
+            cache.get("fs", self.x_range)
+        self.assertEqual(len(cache.entries), 3)
+
+    def test_unseeded_noise_is_not_cached(self):
+        cache = md.CurveCache(md.ModelEngine(self.config))
+        first = cache.get("ci", self.x_range)
+        second = cache.get("ci", self.x_range)
+        self.assertEqual(cache.misses, 2)
+        self.assertFalse(np.array_equal(first, second))
+
+class TestShadowing(unittest.TestCase):
+    def test_models_draw_independent_fading(self):
+        config = cfg.Config("nonexistent.yaml")
+        config.sigma = 2
+        x_range = np.arange(0.5, 500, 2)
+        engine = md.ModelEngine(config, seed=7)
+        abg_noise = engine.abg_pl_array(x_range) - np.array([engine.abg_pl(xi) for xi in x_range])
+        ci_noise = engine.ci_pl_array(x_range) - np.array([engine.ci_pl(xi) for xi in x_range])
+        self.assertFalse(np.allclose(abg_noise, ci_noise))
+        np.testing.assert_array_equal(engine.abg_pl_array(x_range), md.ModelEngine(config, seed=7).abg_pl_array(x_range))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import os
+import json
+import tempfile
+import threading
+import tracemalloc
+from routesignal.profiling import Profiler
+
+class TestProfiler(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        profiler = Profiler()
+        with profiler.span("idle"):
+            pass
+        profiler.count("rows", 10)
+        self.assertEqual(profiler.events, [])
+        self.assertEqual(profiler.counters, {})
+
+    def test_nested_spans_and_memory(self):
+        profiler = Profiler()
+        profiler.enable(trace_memory=True)
+        try:
+            with profiler.span("outer"):
+                with profiler.span("inner"):
+                    block = bytearray(4 * 1024 * 1024)
+                del block
+        finally:
+            profiler.disable()
+        stats = dict(profiler.summary())
+        self.assertEqual(stats["outer"].count, 1)
+        self.assertGreaterEqual(stats["outer"].total, stats["inner"].total)
+        self.assertGreaterEqual(stats["inner"].peak_memory, 4 * 1024 * 1024)
+        self.assertGreaterEqual(stats["outer"].peak_memory, stats["inner"].peak_memory)
+
+    def test_memory_is_growth_within_span(self):
+        profiler = Profiler()
+        profiler.enable(trace_memory=True)
+        try:
+            held = bytearray(16 * 1024 * 1024)
+            with profiler.span("idle"):
+                pass
+            with profiler.span("work"):
+                block = bytearray(4 * 1024 * 1024)
+                del block
+            del held
+        finally:
+            profiler.disable()
+        records = {record.name: record for record in profiler.events}
+        self.assertLess(records["idle"].memory, 1024 * 1024)
+        self.assertGreaterEqual(records["idle"].peak_memory, 16 * 1024 * 1024)
+        self.assertGreater(records["work"].memory, 3.9 * 1024 * 1024)
+        self.assertLess(records["work"].memory, 8 * 1024 * 1024)
+
+    def test_spans_on_threads_keep_their_peaks(self):
+        profiler = Profiler()
+        profiler.enable(trace_memory=True)
+        allocated = threading.Event()
+        main_entered = threading.Event()
+
+        def worker():
+            with profiler.span("worker"):
+                block = bytearray(8 * 1024 * 1024)
+                del block
+                allocated.set()
+                main_entered.wait()
+
+        try:
+            thread = threading.Thread(target=worker)
+            thread.start()
+            allocated.wait()
+            # The main thread's span opens after the allocation and outlives
+            # the worker's span, so it must not be charged for it.
+            with profiler.span("main"):
+                main_entered.set()
+                thread.join()
+        finally:
+            profiler.disable()
+        peaks = {record.name: record.peak_memory for record in profiler.events}
+        self.assertGreaterEqual(peaks["worker"], 8 * 1024 * 1024)
+        self.assertLess(peaks["main"], 8 * 1024 * 1024)
+
+    def test_leaves_external_tracing_running(self):
+        tracemalloc.start()
+        try:
+            profiler = Profiler()
+            profiler.enable(trace_memory=True)
+            profiler.disable()
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+        profiler.enable(trace_memory=True)
+        profiler.disable()
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_chrome_trace_export(self):
+        profiler = Profiler()
+        profiler.enable(trace_memory=False)
+
+        @profiler.timed("work")
+        def work():
+            return 42
+
+        self.assertEqual(work(), 42)
+        profiler.count("rows", 5)
+        profiler.disable()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.json")
+            profiler.export_chrome_trace(path)
+            with open(path) as stream:
+                trace = json.load(stream)
+        phases = {event["name"]: event["ph"] for event in trace["traceEvents"]}
+        self.assertEqual(phases, {"work": "X", "rows": "C"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import os
+import glob
+import numpy as np
+import routesignal.dataset as ds
+import routesignal.query as qr
+
+TESTDATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'carling')
+
+class TestIndexes(unittest.TestCase):
+    def test_categorical_index(self):
+        index = qr.CategoricalIndex(np.array([3, 1, 3, 2, 1, 3]))
+        np.testing.assert_array_equal(index.positions(3), [0, 2, 5])
+        np.testing.assert_array_equal(index.positions([1, 2]), [1, 3, 4])
+        self.assertEqual(index.count(4), 0)
+        np.testing.assert_array_equal(index.contains(np.array([0, 1, 3]), [3, 2]), [True, False, True])
+
+    def test_range_index(self):
+        index = qr.RangeIndex(np.array([5.0, np.nan, 1.0, 3.0, 9.0]))
+        np.testing.assert_array_equal(index.positions((1, 5)), [0, 2, 3])
+        np.testing.assert_array_equal(index.positions((4, None)), [0, 4])
+        self.assertEqual(index.count((None, None)), 4)
+
+class TestDatasetQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dataset = ds.Dataset(sorted(glob.glob(os.path.join(TESTDATA_DIR, '*.csv'))))
+
+    def test_matches_row_scan(self):
+        data = self.dataset.data
+        view = self.dataset.query(mcc=302, act='LTE+', rating=(None, 15), speed=(1, None))
+        mask = ((data['mcc'] == 302) & (data['act'] == 'LTE+') &
+                (data['rating'] <= 15) & (data['speed'] >= 1))
+        np.testing.assert_array_equal(view.positions, np.flatnonzero(mask))
+        self.assertTrue(view.data.equals(data[mask]))
+
+    def test_within_session(self):
+        session = self.dataset.get_session(1)
+        view = self.dataset.query(within=session, act='LTE')
+        self.assertTrue(np.all(view.data['act'] == 'LTE'))
+        self.assertTrue(np.all(np.isin(view.positions, session.positions)))
+        self.assertEqual(len(view.data), (session.data['act'] == 'LTE').sum())
+
+    def test_no_filters_returns_view(self):
+        session = self.dataset.get_session(0)
+        self.assertIs(self.dataset.query(within=session), session)
+        self.assertIs(self.dataset.query(), self.dataset)
+
+    def test_repeated_query_cached(self):
+        session = self.dataset.get_session(0)
+        view = self.dataset.query(within=session, act='LTE')
+        self.assertIs(self.dataset.query(within=session, act='LTE'), view)
+        self.assertIsNot(self.dataset.query(within=session, act='LTE+'), view)
+
+    def test_unindexed_column(self):
+        with self.assertRaises(ValueError):
+            self.dataset.query(signal=-80)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+import routesignal.config as cfg
+import routesignal.models as md
+from routesignal.sweep import SweepEngine
+
+class TestSweepEngine(unittest.TestCase):
+    def setUp(self):
+        self.config = cfg.Config("nonexistent.yaml")
+        self.config.freq = 800
+        self.config.bs_height = 30
+        self.ground = np.linspace(50, 2000, 40)
+        distances = np.sqrt(np.square(self.config.bs_height) + np.square(self.ground))
+        path_loss = md.ModelEngine(self.config).ohu_pl(distances)
+        self.signal = self.config.tx_power - path_loss - self.config.tx_gain - self.config.rx_gain
+
+    def test_grid_finds_true_parameters(self):
+        engine = SweepEngine(self.config, workers=1)
+        result = engine.run(self.ground, self.signal,
+                {"freq": [700, 800, 900], "bs_height": [10, 30, 50]})
+        self.assertEqual(len(result), 9)
+        best = result.best("ohu")
+        self.assertEqual(best["freq"], 800)
+        self.assertEqual(best["bs_height"], 30)
+        self.assertAlmostEqual(best["rmse"], 0)
+
+    def test_chunks_match_single_pass(self):
+        params = {"freq": np.linspace(500, 1000, 11), "ue_height": [1, 1.5, 2]}
+        whole = SweepEngine(self.config, workers=1).run(self.ground, self.signal, params)
+        chunked = SweepEngine(self.config, workers=2, max_bytes=8 * self.ground.size * 4).run(
+                self.ground, self.signal, params)
+        for model in whole.rmse:
+            np.testing.assert_allclose(whole.rmse[model], chunked.rmse[model])
+            np.testing.assert_allclose(whole.bias[model], chunked.bias[model])
+
+    def test_top_k_keeps_best(self):
+        params = {"freq": np.linspace(500, 1000, 21), "bs_height": [10, 20, 30, 40], "ue_height": [1, 1.5, 2]}
+        whole = SweepEngine(self.config, workers=1).run(self.ground, self.signal, params)
+        top = SweepEngine(self.config, workers=1, top_k=3, max_bytes=8 * self.ground.size * 10).run(
+                self.ground, self.signal, params)
+        self.assertLessEqual(len(top), 3 * len(top.rmse))
+        for model in whole.rmse:
+            self.assertEqual(top.best(model), whole.best(model))
+        frame = whole.to_frame().loc[top.index]
+        np.testing.assert_array_equal(frame["freq"], top.params["freq"])
+        np.testing.assert_array_equal(frame["ohu_rmse"], top.rmse["ohu"])
+
+    def test_unknown_parameter(self):
+        with self.assertRaises(ValueError):
+            SweepEngine(self.config).run(self.ground, self.signal, {"sigma": [1, 2]})
+
+    def test_empty_sweep(self):
+        with self.assertRaises(ValueError):
+            SweepEngine(self.config).run(self.ground, self.signal, {})
+        with self.assertRaises(ValueError):
+            SweepEngine(self.config).run(self.ground, self.signal, {"freq": [700, 800], "bs_height": []})
+
+if __name__ == '__main__':
+    unittest.main()
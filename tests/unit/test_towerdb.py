@@ -0,0 +1,71 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import routesignal.towerdb as tdb
+
+HEADER = "radio,mcc,net,area,cell,unit,lon,lat,range,samples,changeable,created,updated,averageSignal\n"
+
+ROWS = [
+    "LTE,302,720,29050,9391431,0,-75.8132,45.3486,1000,12,1,1459692903,1459692903,0",
+    "LTE,302,720,29050,9391432,0,-75.8010,45.3500,800,4,1,1459692903,1459692903,0",
+    "LTE,302,610,3001,9391431,0,-79.3800,43.6500,500,3,1,1459692903,1459692903,0",
+    "GSM,302,720,100,1234,0,-75.7000,45.4000,2000,7,1,1459692903,1459692903,0",
+    "GSM,302,720,200,1234,0,-75.6000,45.4100,2000,9,1,1459692903,1459692903,0",
+    "UMTS,302,720,300,5555,0,-75.5000,45.4200,1000,5,1,1459692903,1459692903,0",
+    "NR,302,720,29050,68719476735,0,-75.8200,45.3450,300,2,1,1459692903,1459692903,0",
+]
+
+class TestTowerDB(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        csv_path = os.path.join(cls.directory.name, "cell_towers.csv")
+        with open(csv_path, "w") as stream:
+            stream.write(HEADER + "\n".join(ROWS) + "\n")
+        cls.db = tdb.import_towers(csv_path, os.path.join(cls.directory.name, "index"), chunksize=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_lookup(self):
+        rows = self.db.lookup([302, 302, 302, 302, 302], [720, 610, 720, 720, 720],
+                [29050, 3001, 200, 29050, 1], [9391431, 9391431, 1234, 68719476735, 5])
+        towers = self.db.get_rows(rows)
+        np.testing.assert_allclose(towers["lat"][:4], [45.3486, 43.65, 45.41, 45.345], rtol=1e-6)
+        self.assertEqual(list(towers["found"]), [True, True, True, True, False])
+        self.assertEqual(towers["radio"][3], "NR")
+
+    def test_lookup_area_mismatch(self):
+        rows = self.db.lookup([302, 302, 302, 302], [720, 720, 720, 720],
+                [999, 999, 1, 1], [1234, 5555, 9391432, 68719476735])
+        self.assertEqual(list(rows[:2]), [-1, -1])
+        self.assertEqual(list(self.db.get_rows(rows)["found"]), [False, False, True, True])
+
+    def test_lookup_dataset_per_area(self):
+        data = pd.DataFrame({"mcc": [302, 302, 302], "mnc": [720, 720, 720],
+            "lac": [100, 200, 100], "cellid": [1234, 1234, 1234]})
+        dataset = type("View", (), {"data": data, "unique_cellids": data["cellid"].unique()})()
+        towers = self.db.lookup_dataset(dataset)
+        self.assertEqual(list(towers["lac"]), [100, 200])
+        np.testing.assert_allclose(towers["lon"], [-75.7, -75.6], rtol=1e-6)
+
+    def test_lookup_dataset(self):
+        data = pd.DataFrame({"mcc": [302, 302, 302], "mnc": [720, 720, 720],
+            "lac": [29050, 29050, 29050], "cellid": [9391432, 9391432, 1]})
+        dataset = type("View", (), {"data": data, "unique_cellids": data["cellid"].unique()})()
+        towers = self.db.lookup_dataset(dataset)
+        self.assertAlmostEqual(towers.loc[9391432, "lon"], -75.801, places=4)
+        self.assertFalse(towers.loc[1, "found"])
+
+    def test_nearest_and_within(self):
+        nearest = self.db.nearest(45.3490, -75.8130, k=2, max_distance_km=5)
+        self.assertEqual(list(nearest["cellid"]), [9391431, 68719476735])
+        self.assertTrue(np.all(np.diff(nearest["distance_km"]) >= 0))
+        inside = self.db.within((-75.8232, -75.7925, 45.3422, 45.3590))
+        self.assertEqual(len(inside), 3)
+
+if __name__ == '__main__':
+    unittest.main()